@@ -315,6 +315,565 @@ def alignment_force(positions, velocities, alignment_strength=0.125, alignment_d
 positions, velocities = initialise_boid_states(rng)
 animate_flock(positions, velocities, [cohesion_force, separation_force, alignment_force])
 
+# %% [markdown]
+# ## Scaling up to larger flocks
+#
+# Our `separation_force` and `alignment_force` functions compute the displacements between *every* pair of boids, in arrays of shape `(num_boids, num_boids, 2)`. The time and memory this needs grows with the square of the number of boids: a flock ten times bigger is a hundred times slower to simulate. We can see this by timing the separation force for flocks of increasing size:
+
+# %%
+for num_boids in [250, 500, 1000, 2000]:
+    positions, velocities = initialise_boid_states(rng, num_boids)
+    print(f"{num_boids} boids:", end=" ")
+    # %timeit -n 3 -r 3 separation_force(positions, velocities)
+
+# %% [markdown]
+# ### Only looking at nearby boids with a grid
+#
+# Most of this work is wasted: only pairs of boids within `separation_distance` (or `alignment_distance`) of each other contribute to the forces, and in a large flock each boid only has a few such neighbours. A classic way of finding them is a *cell list*: we divide the plane into a grid of square cells, with sides equal to the interaction distance. Two boids within that distance of each other must then be in the same cell or in neighbouring cells, so for each boid we only need to check the boids in the 3×3 block of cells around it.
+#
+# We can still do this without any Python loops over boids. We give each cell an integer *key*, and sort the boids by the key of their cell, so that the boids in any cell form a contiguous run in the sorted order. For each of the nine neighbouring cells of each boid, [`np.searchsorted`](https://numpy.org/doc/stable/reference/generated/numpy.searchsorted.html) then finds where the run of boids in that cell starts and stops. We expand these runs into candidate pairs with `np.repeat` and `np.cumsum`, and keep those within the interaction distance.
+
+# %%
+def find_neighbour_pairs(positions, distance):
+    """Find all pairs of boids within a distance of each other using a grid of cells.
+    
+    Args:
+        positions: Array of shape `(num_boids, 2)` defining positions of boids.
+        distance: Scalar distance within which boids are neighbours, also used
+            as the side length of the grid cells.
+    
+    Returns:
+        Tuple of two integer arrays `(i, j)` of equal length, such that the
+        pairs `(i[k], j[k])` are all the ordered pairs of boids within
+        `distance` of each other, including each boid paired with itself.
+    """
+    cells = np.floor(positions / distance).astype(int)
+    # Shift cells so they start from one, leaving an empty border of cells
+    cells -= cells.min(0) - 1
+    num_rows = cells[:, 1].max() + 2
+    keys = cells[:, 0] * num_rows + cells[:, 1]
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    all_i, all_j = [], []
+    for offset_0 in (-1, 0, 1):
+        for offset_1 in (-1, 0, 1):
+            neighbour_keys = keys + offset_0 * num_rows + offset_1
+            starts = np.searchsorted(sorted_keys, neighbour_keys, side="left")
+            counts = np.searchsorted(sorted_keys, neighbour_keys, side="right") - starts
+            # Pair each boid with every boid in the neighbouring cell
+            i = np.repeat(np.arange(len(positions)), counts)
+            run_offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            j = order[np.repeat(starts, counts) + run_offsets]
+            # Same distance calculation as in the force functions, so the same pairs are close
+            are_close = ((positions[j] - positions[i])**2).sum(-1)**0.5 <= distance
+            all_i.append(i[are_close])
+            all_j.append(j[are_close])
+    return np.concatenate(all_i), np.concatenate(all_j)
+
+
+# %% [markdown]
+# The forces are then sums over these pairs only. In `separation_force` the force on boid `j` is the sum of the displacements `positions[j] - positions[i]` from each of its neighbours `i`. Summing values into the entries given by an array of indices is exactly what [`np.bincount`](https://numpy.org/doc/stable/reference/generated/numpy.bincount.html) does when passed `weights`, which we apply to each coordinate in turn. The alignment force is computed in the same way, remembering that `alignment_force` averages over *all* boids rather than just the neighbours.
+
+# %%
+def sum_over_pairs(values, j, num_boids):
+    """Sum values for each pair into the boid at the second index of each pair.
+    
+    Args:
+        values: Array of shape `(num_pairs, 2)` of values for each pair.
+        j: Integer array of shape `(num_pairs,)` of the boids to sum into.
+        num_boids: Total number of boids.
+    
+    Returns:
+        Array of shape `(num_boids, 2)` of the summed values for each boid.
+    """
+    return np.stack(
+        [np.bincount(j, weights=values[:, d], minlength=num_boids) for d in range(values.shape[1])],
+        axis=-1
+    )
+
+
+def separation_force_grid(positions, velocities, separation_strength=1., separation_distance=10.):
+    i, j = find_neighbour_pairs(positions, separation_distance)
+    return separation_strength * sum_over_pairs(positions[j] - positions[i], j, len(positions))
+
+
+def alignment_force_grid(positions, velocities, alignment_strength=0.125, alignment_distance=100):
+    i, j = find_neighbour_pairs(positions, alignment_distance)
+    velocity_differences = velocities[j] - velocities[i]
+    return -alignment_strength * sum_over_pairs(velocity_differences, j, len(positions)) / len(positions)
+
+
+# %% [markdown]
+# These should give the same forces as the original functions, up to the rounding errors from adding the same terms in a different order, which we can check with [`np.testing.assert_allclose`](https://numpy.org/doc/stable/reference/generated/numpy.testing.assert_allclose.html). We use a denser flock than usual so that plenty of boids are within `separation_distance` of each other.
+
+# %%
+positions, velocities = initialise_boid_states(rng, 1000, max_position=(400, 1300))
+np.testing.assert_allclose(
+    separation_force_grid(positions, velocities), separation_force(positions, velocities), atol=1e-9
+)
+np.testing.assert_allclose(
+    alignment_force_grid(positions, velocities), alignment_force(positions, velocities), atol=1e-9
+)
+
+# %% [markdown]
+# The time taken by the grid versions now grows roughly in proportion to the number of boids, as long as the flock does not get much denser, letting us simulate far bigger flocks:
+
+# %%
+for num_boids in [250, 500, 1000, 2000]:
+    positions, velocities = initialise_boid_states(
+        rng, num_boids, min_position=(0, 0), max_position=(20 * num_boids, 20 * num_boids)
+    )
+    print(f"{num_boids} boids:", end=" ")
+    # %timeit -n 3 -r 3 separation_force_grid(positions, velocities)
+
+# %%
+positions, velocities = initialise_boid_states(rng)
+animate_flock(positions, velocities, [cohesion_force, separation_force_grid, alignment_force_grid])
+
+# %% [markdown]
+# ### Sharing one neighbour search between all forces
+#
+# A uniform grid works well when boids are spread evenly, but our boids tend to *flock*: most of them end up bunched in a few cells while the rest of the grid is empty, and the cells with many boids in them bring back the quadratic cost. A [*k*-d tree](https://en.wikipedia.org/wiki/K-d_tree) instead splits space adaptively, into smaller regions where there are more boids. SciPy provides a fast implementation as [`scipy.spatial.cKDTree`](https://docs.scipy.org/doc/scipy/reference/generated/scipy.spatial.cKDTree.html), whose `query_pairs` method finds all pairs of points within a distance of each other.
+#
+# Rather than each force function searching for neighbours itself, we can search once per timestep and share the result between all the forces. We make the search *pluggable*: each way of searching is a class which is created from the positions of the boids at the start of each timestep, and has a `pairs` method returning the pairs of boids within a given distance, in the same form as `find_neighbour_pairs`. Any of the classes can then be used with the same force functions.
+
+# %%
+from scipy.spatial import cKDTree
+
+
+class DenseNeighbours:
+    """Neighbour search comparing the distances between every pair of boids.
+    
+    Args:
+        positions: Array of shape `(num_boids, 2)` defining positions of boids.
+    """
+    
+    def __init__(self, positions):
+        displacements = positions[np.newaxis] - positions[:, np.newaxis]
+        self.distances = (displacements**2).sum(-1)**0.5
+    
+    def pairs(self, distance):
+        """Find all ordered pairs of boids `(i, j)` within a distance of each other."""
+        return np.nonzero(self.distances <= distance)
+
+
+class GridNeighbours:
+    """Neighbour search using a grid of cells, as in `find_neighbour_pairs`.
+    
+    Args:
+        positions: Array of shape `(num_boids, 2)` defining positions of boids.
+    """
+    
+    def __init__(self, positions):
+        self.positions = positions
+    
+    def pairs(self, distance):
+        """Find all ordered pairs of boids `(i, j)` within a distance of each other."""
+        return find_neighbour_pairs(self.positions, distance)
+
+
+class KDTreeNeighbours:
+    """Neighbour search using a k-d tree, built once for all queries.
+    
+    Args:
+        positions: Array of shape `(num_boids, 2)` defining positions of boids.
+    """
+    
+    def __init__(self, positions):
+        self.tree = cKDTree(positions)
+    
+    def pairs(self, distance):
+        """Find all ordered pairs of boids `(i, j)` within a distance of each other."""
+        # query_pairs gives each pair once with i < j, so add the reversed pairs
+        # and each boid paired with itself
+        pairs = self.tree.query_pairs(distance, output_type="ndarray")
+        boids = np.arange(self.tree.n)
+        return (
+            np.concatenate([pairs[:, 0], pairs[:, 1], boids]),
+            np.concatenate([pairs[:, 1], pairs[:, 0], boids])
+        )
+
+
+# %% [markdown]
+# The force functions now take the neighbour search object as an extra argument, and the timestep function creates it, using whichever class it is given, once the positions have been updated:
+
+# %%
+def separation_force_neighbours(
+    positions, velocities, neighbours, separation_strength=1., separation_distance=10.
+):
+    i, j = neighbours.pairs(separation_distance)
+    return separation_strength * sum_over_pairs(positions[j] - positions[i], j, len(positions))
+
+
+def alignment_force_neighbours(
+    positions, velocities, neighbours, alignment_strength=0.125, alignment_distance=100
+):
+    i, j = neighbours.pairs(alignment_distance)
+    velocity_differences = velocities[j] - velocities[i]
+    return -alignment_strength * sum_over_pairs(velocity_differences, j, len(positions)) / len(positions)
+
+
+def cohesion_force_neighbours(positions, velocities, neighbours, cohesion_strength=0.01):
+    return cohesion_force(positions, velocities, cohesion_strength)
+
+
+def simulate_timestep_neighbours(
+    positions, velocities, forces, timestep, neighbour_search=KDTreeNeighbours
+):
+    """Simulate model dynamics forward one timestep, sharing one neighbour search.
+    
+    Args:
+        positions: Array of shape `(num_boids, 2)` defining positions of boids.
+        velocities: Array of shape `(num_boids, 2)` defining velocities of boids.
+        forces: Sequence of functions computing forces on boids given positions
+            and velocities of all boids, and a neighbour search object.
+        timestep: Scalar timestep to use for numerical integrator.
+        neighbour_search: Class used to search for neighbours, created from the
+            positions of the boids once per timestep.
+    """
+    positions += timestep * velocities
+    neighbours = neighbour_search(positions)
+    velocities += timestep * sum(force(positions, velocities, neighbours) for force in forces)
+
+
+# %% [markdown]
+# All three searches should give the same forces as the original functions. The k-d tree computes distances slightly differently, so boids almost exactly at the interaction distance from each other could be counted differently, but this is vanishingly unlikely with randomly placed boids.
+
+# %%
+positions, velocities = initialise_boid_states(rng, 1000, max_position=(400, 1300))
+for neighbour_search in [DenseNeighbours, GridNeighbours, KDTreeNeighbours]:
+    neighbours = neighbour_search(positions)
+    np.testing.assert_allclose(
+        separation_force_neighbours(positions, velocities, neighbours),
+        separation_force(positions, velocities),
+        atol=1e-9
+    )
+    np.testing.assert_allclose(
+        alignment_force_neighbours(positions, velocities, neighbours),
+        alignment_force(positions, velocities),
+        atol=1e-9
+    )
+
+# %% [markdown]
+# To compare the searches on a flock which has bunched up, we let a large flock evolve for a while before timing a whole timestep with each of them:
+
+# %%
+positions, velocities = initialise_boid_states(
+    rng, 5000, min_position=(0, 0), max_position=(2000, 2000)
+)
+forces = [cohesion_force_neighbours, separation_force_neighbours, alignment_force_neighbours]
+for step in range(50):
+    simulate_timestep_neighbours(positions, velocities, forces, 0.1)
+for neighbour_search in [GridNeighbours, KDTreeNeighbours]:
+    print(neighbour_search.__name__, end=": ")
+    # %timeit -n 3 -r 3 simulate_timestep_neighbours(positions.copy(), velocities.copy(), forces, 0.1, neighbour_search)
+
+# %% [markdown]
+# To animate simulations using the new timestep function, we let `animate_flock` take the function used to simulate each timestep as an argument, defaulting to our original `simulate_timestep`:
+
+# %%
+def animate_flock(
+    positions, velocities, forces=(), timestep=1., num_step=100, step_function=simulate_timestep
+):
+    """Visualise the dynamics of the boids as a Matplotlib animation.
+    
+    Args:
+        positions: Array of shape `(num_boids, 2)` defining positions of boids.
+        velocities: Array of shape `(num_boids, 2)` defining velocities of boids.
+        forces: Sequence of functions computing forces on boids given positions
+            and velocities of all boids.
+        timestep: Scalar timestep to use for numerical integrator.
+        num_step: Number of timesteps to simulate in animation.
+        step_function: Function simulating one timestep, called with the
+            positions, velocities, forces and timestep.
+    
+    Returns:
+        Matplotlib animation of simulated boid dynamics.
+    """
+    fig, ax, arrows = plot_boids(positions, velocities)
+
+    def update_frame(frame_index):
+        step_function(positions, velocities, forces, timestep)
+        velocity_unit_vectors = calculate_unit_vectors(velocities)
+        arrows.set_offsets(positions)
+        arrows.set_UVC(velocity_unit_vectors[:, 0], velocity_unit_vectors[:, 1])
+        return [arrows]
+    
+    # Close Matplotlib figure object to avoid displaying static figure as well as animation
+    plt.close(fig)
+    return animation.FuncAnimation(fig, update_frame, num_step, interval=50)
+
+
+# %%
+positions, velocities = initialise_boid_states(rng)
+animate_flock(positions, velocities, forces, step_function=simulate_timestep_neighbours)
+
+# %% [markdown]
+# ### Computing the pairwise displacements once
+#
+# For smaller flocks, the dense calculation is simple and fast enough, but our original force functions still waste effort: `separation_force` and `alignment_force` each compute the displacements between all pairs of boids, and the distances between them, from scratch, every timestep. We can instead compute these once per timestep in a *fused* force evaluator, and pass them to a list of force *rules* which only do the work specific to each force.
+#
+# So that we can later compute the forces on only some of the boids at a time, the rules are also told which boids the forces are acting on, the `receivers`, as an index into the positions and velocities arrays. The displacements and distances then have shape `(num_boids, num_receivers, 2)` and `(num_boids, num_receivers)`, with `displacements[i, j]` the displacement of the `j`th receiver from boid `i`. For now the receivers are all the boids, given by the slice `slice(None)`, equivalent to indexing with `:`.
+
+# %%
+def cohesion_rule(positions, velocities, receivers, displacements, distances, cohesion_strength=0.01):
+    return cohesion_strength * (positions.mean(axis=0)[np.newaxis] - positions[receivers])
+
+
+def separation_rule(
+    positions, velocities, receivers, displacements, distances,
+    separation_strength=1., separation_distance=10.
+):
+    are_close = distances <= separation_distance
+    return separation_strength * np.where(are_close[..., None], displacements, 0).sum(0)
+
+
+def alignment_rule(
+    positions, velocities, receivers, displacements, distances,
+    alignment_strength=0.125, alignment_distance=100
+):
+    velocity_differences = velocities[receivers][np.newaxis] - velocities[:, np.newaxis]
+    are_close = distances <= alignment_distance
+    return -alignment_strength * np.where(are_close[..., None], velocity_differences, 0).mean(0)
+
+
+def fused_forces(positions, velocities, rules, receivers=slice(None)):
+    """Compute the total force from all rules, sharing pairwise displacements and distances.
+    
+    Args:
+        positions: Array of shape `(num_boids, 2)` defining positions of boids.
+        velocities: Array of shape `(num_boids, 2)` defining velocities of boids.
+        rules: Sequence of functions computing forces on the receiving boids
+            given positions and velocities of all boids, the receivers, and the
+            displacements and distances of the receivers from all boids.
+        receivers: Index or slice selecting the boids to compute forces on.
+    
+    Returns:
+        Array of shape `(num_receivers, 2)` of the total force on each receiver.
+    """
+    displacements = positions[receivers][np.newaxis] - positions[:, np.newaxis]
+    distances = (displacements**2).sum(-1)**0.5
+    return sum(rule(positions, velocities, receivers, displacements, distances) for rule in rules)
+
+
+def simulate_timestep_fused(positions, velocities, rules, timestep):
+    """Simulate model dynamics forward one timestep, evaluating all rules together.
+    
+    Args:
+        positions: Array of shape `(num_boids, 2)` defining positions of boids.
+        velocities: Array of shape `(num_boids, 2)` defining velocities of boids.
+        rules: Sequence of force rules, as taken by `fused_forces`.
+        timestep: Scalar timestep to use for numerical integrator.
+    """
+    positions += timestep * velocities
+    velocities += timestep * fused_forces(positions, velocities, rules)
+
+
+# %% [markdown]
+# The rules do exactly the same arithmetic as the original force functions, which we keep as the reference implementation, so this time we can check with [`np.testing.assert_array_equal`](https://numpy.org/doc/stable/reference/generated/numpy.testing.assert_array_equal.html) that a timestep gives *identical* results, not just close ones:
+
+# %%
+positions, velocities = initialise_boid_states(rng, 1000, max_position=(400, 1300))
+reference_positions, reference_velocities = positions.copy(), velocities.copy()
+simulate_timestep(
+    reference_positions, reference_velocities, [cohesion_force, separation_force, alignment_force], 1.
+)
+rules = [cohesion_rule, separation_rule, alignment_rule]
+simulate_timestep_fused(positions, velocities, rules, 1.)
+np.testing.assert_array_equal(positions, reference_positions)
+np.testing.assert_array_equal(velocities, reference_velocities)
+
+# %% [markdown]
+# and compare the time taken by a timestep:
+
+# %%
+# %timeit -n 3 -r 3 simulate_timestep(positions, velocities, [cohesion_force, separation_force, alignment_force], 1.)
+# %timeit -n 3 -r 3 simulate_timestep_fused(positions, velocities, rules, 1.)
+
+# %%
+positions, velocities = initialise_boid_states(rng)
+animate_flock(positions, velocities, rules, step_function=simulate_timestep_fused)
+
+# %% [markdown]
+# ### Bounding memory use by working in blocks
+#
+# Even when we are happy to wait for the quadratic number of operations, we may not have the memory for them: with 20,000 boids, a single array of shape `(num_boids, num_boids, 2)` of 64-bit floats takes 6.4 GB, and the fused evaluator needs several arrays of that size at once. As each force rule sums over all boids for each receiver separately, we can instead compute the forces on a *block* of receivers at a time, using our `receivers` argument, and only ever need arrays of shape `(num_boids, block_size, 2)`.
+#
+# We choose the block size so that the arrays for one block fit within a memory budget. Counting the arrays `fused_forces` and our rules create, each pair of a boid and a receiver needs up to about 64 bytes at any one time.
+
+# %%
+def chunked_forces(positions, velocities, rules, memory_budget=2**28, bytes_per_pair=64):
+    """Compute the total force from all rules, for blocks of boids at a time.
+    
+    Args:
+        positions: Array of shape `(num_boids, 2)` defining positions of boids.
+        velocities: Array of shape `(num_boids, 2)` defining velocities of boids.
+        rules: Sequence of force rules, as taken by `fused_forces`.
+        memory_budget: Approximate number of bytes the temporary arrays for a
+            block may take up.
+        bytes_per_pair: Number of bytes of temporary arrays needed for each
+            pair of a boid and a receiver.
+    
+    Returns:
+        Array of shape `(num_boids, 2)` of the total force on each boid.
+    """
+    num_boids = len(positions)
+    block_size = max(1, memory_budget // (num_boids * bytes_per_pair))
+    forces = np.empty_like(positions)
+    for start in range(0, num_boids, block_size):
+        receivers = slice(start, start + block_size)
+        forces[receivers] = fused_forces(positions, velocities, rules, receivers)
+    return forces
+
+
+# %% [markdown]
+# Each force is computed from exactly the same terms, added in the same order, whatever the block size, so the results are identical to the fused evaluator's, even with blocks of a single boid:
+
+# %%
+positions, velocities = initialise_boid_states(rng, 1000, max_position=(400, 1300))
+expected_forces = fused_forces(positions, velocities, rules)
+for memory_budget in [1, 2**20, 2**24, 2**30]:
+    np.testing.assert_array_equal(
+        chunked_forces(positions, velocities, rules, memory_budget), expected_forces
+    )
+
+# %% [markdown]
+# We can check how much memory is used with the [`tracemalloc` module](https://docs.python.org/3/library/tracemalloc.html) from the standard library, which NumPy reports its array allocations to:
+
+# %%
+import tracemalloc
+
+for name, evaluate in [
+    ("fused", lambda: fused_forces(positions, velocities, rules)),
+    ("chunked, 16 MB budget", lambda: chunked_forces(positions, velocities, rules, 2**24)),
+]:
+    tracemalloc.start()
+    evaluate()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name}: peak memory {peak / 2**20:.1f} MB")
+
+# %% [markdown]
+# ### Simulating without rendering
+#
+# In `animate_flock` each timestep is simulated inside `update_frame`, so the simulation can only run as fast as Matplotlib redraws the figure, and has to be run again each time we want to look at it. Now that our timesteps are fast, it is better to separate the two: first simulate the flock *headless*, without any plotting, recording its state every few timesteps, then replay the recorded states as an animation.
+#
+# As we know in advance how many states we will record, we can allocate the arrays to hold them once, of shape `(num_record, num_boids, 2)`, rather than appending to lists. For long simulations of large flocks the recording may not fit in memory, so we also allow writing it to [HDF5 datasets](./070hdf5.html) instead, which `h5py` stores in *chunks* of one recorded state each, so that they are written to disk as we go.
+
+# %%
+def run_flock(
+    positions, velocities, forces=(), timestep=1., num_step=100, record_every=1,
+    step_function=simulate_timestep, output=None
+):
+    """Simulate the dynamics of the boids without visualising them, recording their states.
+    
+    Args:
+        positions: Array of shape `(num_boids, 2)` defining positions of boids.
+        velocities: Array of shape `(num_boids, 2)` defining velocities of boids.
+        forces: Sequence of functions computing forces on boids given positions
+            and velocities of all boids.
+        timestep: Scalar timestep to use for numerical integrator.
+        num_step: Number of timesteps to simulate.
+        record_every: Number of timesteps between recorded states.
+        step_function: Function simulating one timestep, called with the
+            positions, velocities, forces and timestep.
+        output: Optional `h5py` file or group in which to create datasets
+            `positions` and `velocities` to record states in. If `None`,
+            states are recorded in NumPy arrays.
+    
+    Returns:
+        Tuple of arrays (or `h5py` datasets) of shape `(num_record, num_boids, 2)`
+        with the recorded positions and velocities of the boids, starting with
+        the initial state.
+    """
+    num_record = num_step // record_every + 1
+    shape = (num_record,) + positions.shape
+    if output is None:
+        recorded_positions = np.empty(shape, dtype=positions.dtype)
+        recorded_velocities = np.empty(shape, dtype=velocities.dtype)
+    else:
+        chunks = (1,) + positions.shape
+        recorded_positions = output.create_dataset(
+            "positions", shape, dtype=positions.dtype, chunks=chunks
+        )
+        recorded_velocities = output.create_dataset(
+            "velocities", shape, dtype=velocities.dtype, chunks=chunks
+        )
+    recorded_positions[0] = positions
+    recorded_velocities[0] = velocities
+    for step in range(1, num_step + 1):
+        step_function(positions, velocities, forces, timestep)
+        if step % record_every == 0:
+            recorded_positions[step // record_every] = positions
+            recorded_velocities[step // record_every] = velocities
+    return recorded_positions, recorded_velocities
+
+
+def replay_flock(recorded_positions, recorded_velocities, interval=50):
+    """Visualise recorded states of the boids as a Matplotlib animation.
+    
+    Args:
+        recorded_positions: Array of shape `(num_record, num_boids, 2)` of
+            recorded positions of boids, as returned by `run_flock`.
+        recorded_velocities: Array of shape `(num_record, num_boids, 2)` of
+            recorded velocities of boids, as returned by `run_flock`.
+        interval: Delay between frames in milliseconds.
+    
+    Returns:
+        Matplotlib animation of recorded boid dynamics.
+    """
+    fig, ax, arrows = plot_boids(recorded_positions[0], recorded_velocities[0])
+
+    def update_frame(frame_index):
+        velocity_unit_vectors = calculate_unit_vectors(recorded_velocities[frame_index])
+        arrows.set_offsets(recorded_positions[frame_index])
+        arrows.set_UVC(velocity_unit_vectors[:, 0], velocity_unit_vectors[:, 1])
+        return [arrows]
+    
+    # Close Matplotlib figure object to avoid displaying static figure as well as animation
+    plt.close(fig)
+    return animation.FuncAnimation(fig, update_frame, len(recorded_positions), interval=interval)
+
+
+# %% [markdown]
+# Recording every timestep, the final recorded state is the same as after simulating the timesteps directly:
+
+# %%
+forces = [cohesion_force, separation_force, alignment_force]
+positions, velocities = initialise_boid_states(rng)
+expected_positions, expected_velocities = positions.copy(), velocities.copy()
+for step in range(100):
+    simulate_timestep(expected_positions, expected_velocities, forces, 1.)
+recorded_positions, recorded_velocities = run_flock(positions, velocities, forces, num_step=100)
+print(recorded_positions.shape)
+np.testing.assert_array_equal(recorded_positions[-1], expected_positions)
+np.testing.assert_array_equal(recorded_velocities[-1], expected_velocities)
+
+# %% [markdown]
+# Without any rendering, simulating is now limited only by the speed of our timestep function. Here we simulate 200 timesteps of a larger flock, recording every second state:
+
+# %%
+positions, velocities = initialise_boid_states(rng, 1000, max_position=(400, 1300))
+# %time recording = run_flock(positions.copy(), velocities.copy(), rules, 0.5, 200, 2, simulate_timestep_fused)
+
+# %% [markdown]
+# To record to an HDF5 file instead, we pass the open file as `output`:
+
+# %%
+import h5py
+
+with h5py.File("boids.hdf5", "w") as hdf_file:
+    run_flock(positions, velocities, rules, 0.5, 200, 2, simulate_timestep_fused, hdf_file)
+
+# %% [markdown]
+# We can then replay the recording as often as we like, here reading it back from the file:
+
+# %%
+with h5py.File("boids.hdf5", "r") as hdf_file:
+    recorded_positions = hdf_file["positions"][:]
+    recorded_velocities = hdf_file["velocities"][:]
+replay_flock(recorded_positions, recorded_velocities)
+
 # %% [markdown]
 # ## Conclusion and extensions
 #
@@ -1,6 +1,6 @@
 """ Unit tests for a diffusion model """
 from nose.tools import assert_raises, assert_almost_equal
-from diffusion_model import energy
+from diffusion_model import energy, fast_energy, energies, DiffusionEnergy
 
 # def test_energy_fails_on_non_integer_density():
 #   with assert_raises(TypeError) as exception: energy([1.0, 2, 3])
@@ -60,3 +60,54 @@ def test_coefficient_is_linear():
   value = energy(density, coefficient = 1)
   twice = energy(density, coefficient = 2e0)
   assert_almost_equal(value + value, twice)
+
+def test_local_energy_delta():
+  """ Energy change from delta is the difference of total energies """
+  from numpy.random import randint
+
+  local = DiffusionEnergy(coefficient=1.5)
+  for i in range(100):
+    density = randint(1, 50, size=randint(2, 100))
+    source = randint(len(density))
+    target = (source + 1) % len(density)
+
+    moved = density.copy()
+    moved[source] -= 1
+    moved[target] += 1
+    assert_almost_equal(local(density), energy(density, coefficient=1.5))
+    assert_almost_equal(local.delta(density, source, target),
+                        energy(moved, coefficient=1.5) - energy(density, coefficient=1.5))
+
+def test_fast_and_batched_energies():
+  """ Unchecked energies are the same as the checked one """
+  from numpy import zeros
+  from numpy.random import randint
+
+  densities = randint(50, size=(20, randint(1, 100)))
+  densities[0] = 0
+  expected = [energy(density, coefficient=0.5) for density in densities]
+  for density, value in zip(densities, expected):
+    assert_almost_equal(fast_energy(density, coefficient=0.5), value)
+  for actual, value in zip(energies(densities, coefficient=0.5), expected):
+    assert_almost_equal(actual, value)
+  for actual, value in zip(DiffusionEnergy(0.5).batch(densities), expected):
+    assert_almost_equal(actual, value)
+  assert_almost_equal(fast_energy(zeros(0, dtype=int)), 0)
+
+def test_lattice_energies():
+  """ Energy on a lattice only depends on the number of particles on each site """
+  from numpy.random import randint
+
+  density = randint(1, 50, size=(4, 5, 6))
+  expected = energy(density.ravel(), coefficient=2)
+  assert_almost_equal(energy(density, coefficient=2), expected)
+  assert_almost_equal(fast_energy(density, coefficient=2), expected)
+  stack = randint(50, size=(3, 4, 5))
+  for actual, density in zip(energies(stack), stack):
+    assert_almost_equal(actual, energy(density))
+
+  local = DiffusionEnergy()
+  moved = density.copy()
+  moved[1, 2] -= 1
+  moved[2, 2] += 1
+  assert_almost_equal(local.delta(density, (1, 2), (2, 2)), energy(moved) - energy(density))
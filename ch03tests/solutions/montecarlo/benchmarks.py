@@ -0,0 +1,98 @@
+""" Times the ways of running MonteCarlo against each other
+
+    Run as ``python benchmarks.py`` from this directory, see ``--help``. The
+    diffusion model's energy is taken from the neighbouring diffusionmodel
+    directory.
+"""
+import sys
+from argparse import ArgumentParser
+from os.path import dirname, join
+from timeit import repeat
+
+sys.path.append(join(dirname(__file__), '..', 'diffusionmodel'))
+from diffusion_model import DiffusionEnergy, energy
+from monte_carlo import MonteCarlo
+
+MODES = {
+    "python": {},
+    "local energy": {"local": True},
+    "in place, indexed, blocks": {"local": True, "inplace": True, "indexed": True, "random": 0},
+    "jit": {"local": True, "jit": True, "random": 0},
+}
+""" Options of each mode. "local" uses DiffusionEnergy rather than energy. """
+
+LATTICES = [(100,), (256, 256), (64, 64, 64)]
+""" Lattices over which to check the cost of a step does not grow with size """
+
+
+def time_mode(options, density, itermax, repeats=3):
+    """ Best time, in seconds, of running MonteCarlo with the given options """
+    options = dict(options)
+    local = options.pop("local", False)
+    montecarlo = MonteCarlo(temperature=1.0, itermax=itermax, **options)
+    function = DiffusionEnergy() if local else energy
+    # The first run also compiles the jit mode, so is not timed
+    montecarlo(function, density)
+    return min(repeat(lambda: montecarlo(function, density), number=1, repeat=repeats))
+
+
+def time_lattices(shapes=LATTICES, particles=5, itermax=10**4, repeats=3, periodic=True):
+    """ Time per step on lattices of each shape, moving particles locally in place
+
+        Setting up a run, e.g. indexing the particles, takes time proportional
+        to the size of the lattice. So runs of itermax and twice itermax steps
+        are timed, and the difference gives the time of the steps alone.
+
+        :returns: list of (shape, seconds per step)
+    """
+    from numpy import full
+
+    options = dict(MODES["in place, indexed, blocks"], periodic=periodic)
+    results = []
+    for shape in shapes:
+        density = full(shape, particles)
+        short = time_mode(options, density, itermax, repeats)
+        long = time_mode(options, density, 2 * itermax, repeats)
+        results.append((shape, (long - short) / itermax))
+    return results
+
+
+def process():
+    from numpy import full
+
+    parser = ArgumentParser(description="Benchmark MonteCarlo")
+    parser.add_argument('--sites', '-s', type=int, default=100)
+    parser.add_argument('--particles', '-p', type=int, default=5,
+                        help="Initial number of particles on each site")
+    parser.add_argument('--itermax', '-n', type=int, default=10**4,
+                        help="Iterations of the python modes")
+    parser.add_argument('--jit-itermax', type=int, default=10**6,
+                        help="Iterations of the jit mode")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--modes', '-m', nargs='+', choices=list(MODES))
+    parser.add_argument('--lattices', action='store_true',
+                        help="Time steps on 1, 2 and 3-dimensional lattices instead")
+    arguments = parser.parse_args()
+
+    if arguments.lattices:
+        print(f"{'lattice':<16} {'sites':>10} {'us/step':>10}")
+        for shape, step in time_lattices(particles=arguments.particles,
+                                         itermax=arguments.itermax, repeats=arguments.repeats):
+            sites = 1
+            for length in shape: sites *= length
+            print(f"{'x'.join(map(str, shape)):<16} {sites:>10} {step * 1e6:>10.3f}")
+        return
+
+    density = full(arguments.sites, arguments.particles)
+    modes = arguments.modes or list(MODES)
+    print(f"{'mode':<28} {'iterations':>10} {'us/step':>10} {'speedup':>8}")
+    reference = None
+    for mode in modes:
+        itermax = arguments.jit_itermax if MODES[mode].get("jit") else arguments.itermax
+        step = time_mode(MODES[mode], density, itermax, arguments.repeats) / itermax
+        reference = step if reference is None else reference
+        print(f"{mode:<28} {itermax:>10} {step * 1e6:>10.3f} {reference / step:>8.1f}")
+
+
+if __name__ == "__main__":
+    process()
@@ -0,0 +1,52 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+def run_diffusion(density, coefficient, temperature, itermax, seed):
+    """ Metropolis loop for the diffusion model's energy, to compile with Numba.
+
+        Moves particles in density, in place, exactly as `MonteCarlo` would,
+        with the energy updated locally at every step.
+
+        :returns: The final energy, and the number of accepted moves.
+    """
+    np.random.seed(seed)
+    length = len(density)
+    total = 0
+    energy = 0.0
+    for n in density:
+        total += n
+        energy += 0.5 * coefficient * n * (n - 1)
+
+    accepted = 0
+    for iteration in range(itermax):
+        particle = np.random.randint(0, total)
+        current = 0
+        location = 0
+        for location in range(length):
+            current += density[location]
+            if current > particle: break
+
+        if location == 0: direction = 1
+        elif location == length - 1: direction = -1
+        elif np.random.random() < 0.5: direction = -1
+        else: direction = 1
+
+        delta = coefficient * (density[location + direction] - density[location] + 1)
+        if delta <= 0 or np.exp(-delta / temperature) > np.random.random():
+            density[location] -= 1
+            density[location + direction] += 1
+            energy += delta
+            accepted += 1
+    return energy, accepted
+
+
+@lru_cache(maxsize=None)
+def diffusion_kernel():
+    """ run_diffusion, compiled with Numba, or None if Numba is not installed. """
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(run_diffusion)
@@ -0,0 +1,141 @@
+from monte_carlo import local_energy
+
+
+class Ensemble(object):
+    """ Many independent Monte Carlo chains, stepped together.
+
+        The densities of all chains are stacked along the first axis of a
+        single array, each a lattice of any dimension. At each step, every
+        chain proposes moving one of its particles, and the moves are scored
+        and accepted or rejected all at once with numpy, rather than by one
+        python loop per chain.
+    """
+    def __init__(self, temperatures=100, itermax=100, random=None, periodic=False):
+        from numpy import any, asarray
+        from numpy.random import default_rng
+
+        temperatures = asarray(temperatures, dtype=float)
+        if any(temperatures == 0): raise NotImplementedError("Zero temperature not implemented")
+        if any(temperatures < 0e0): raise ValueError("Negative temperature makes no sense")
+
+        self.temperatures = temperatures
+        """ Temperature of each chain, or of all chains """
+        self.itermax = itermax
+        """ Maximum number of iterations """
+        self.random = default_rng(random)
+        """ numpy Generator all random numbers are drawn from """
+        self.periodic = periodic
+        """ Whether the lattices wrap around at their edges, along every axis """
+
+    def random_moves(self, densities):
+        """ Picks a particle, and a site next to it to move it to, for each chain.
+
+            Sites are indices into each chain's flattened lattice, as in
+            `MonteCarlo.random_move`. A move picks an axis, then a direction
+            along it.
+
+            :returns: (location, direction), arrays with one entry per chain:
+                the site of the particle, and the offset from it to the site
+                it moves to.
+        """
+        from numpy import array, cumprod, where
+
+        nchains, shape = len(densities), densities.shape[1:]
+        cumulative = densities.reshape(nchains, -1).cumsum(axis=1)
+        particle = (self.random.random(nchains) * cumulative[:, -1]).astype(int)
+        # Number of sites holding only particles before the chosen one
+        location = (cumulative <= particle[:, None]).sum(axis=1)
+
+        if len(shape) == 1: stride, length = 1, shape[0]
+        else:
+            axes = array([axis for axis, length in enumerate(shape) if length > 1])
+            axis = axes[(self.random.random(nchains) * len(axes)).astype(int)]
+            strides = cumprod((shape[1:] + (1,))[::-1])[::-1]
+            stride, length = strides[axis], array(shape)[axis]
+        coordinate = (location // stride) % length
+
+        direction = where(self.random.random(nchains) < 0.5, -1, 1)
+        if not self.periodic:
+            direction[coordinate == 0] = 1
+            direction[coordinate == length - 1] = -1
+        return location, ((coordinate + direction) % length - coordinate) * stride
+
+    def accept_changes(self, prior, successor):
+        """ Returns true for each chain which should accept its change. """
+        from numpy import exp, errstate, logical_or
+
+        with errstate(over='ignore'):
+            probability = exp(-(successor - prior) / self.temperatures)
+        return logical_or(successor <= prior, probability > self.random.random(len(prior)))
+
+    def __call__(self, energy, densities):
+        """ Runs Monte-Carlo over each chain.
+
+            :Parameters:
+              energy: callable
+                Energy of a single density. If it has a local update,
+                ``energy.delta(densities, sources, targets)`` is given the
+                flattened lattices, one row per chain, and tuples of (chain,
+                site) indices into them, and should return the changes in
+                energy of every chain at once. If it has a
+                ``batch(densities)`` method, it is used to compute the energy
+                of all chains at once.
+              densities: array of positive integers
+                Initial density of each chain, stacked along the first axis.
+            :returns: The final densities and energies of all chains.
+        """
+        from numpy import any, arange, array
+
+        densities = array(densities)
+        if densities.ndim < 2:
+            raise ValueError("Densities should be stacked along a first axis, one per chain.")
+        if densities[0].size < 2:
+            raise ValueError("Densities are too short")
+        if densities.dtype.kind != 'i' and densities.size > 0:
+            raise TypeError("Densities should be an array of *integers*.")
+        if any(densities < 0):
+            raise ValueError("Densities should be an array of *positive* integers.")
+        # Moves are made on a flattened view, seen by energies and observers as densities
+        flat = densities.reshape(len(densities), -1)
+        if any(flat.sum(axis=1) == 0):
+            raise ValueError("Density of a chain is empty.")
+
+        chains = arange(len(densities))
+        batch = getattr(type(energy), 'batch', None) and energy.batch
+        if batch is None: batch = lambda densities: [energy(density) for density in densities]
+        energies = array(batch(densities), dtype=float)
+        delta = local_energy(energy)
+        iteration = 0
+        while iteration < self.itermax or self.itermax < 0:
+
+            location, direction = self.random_moves(densities)
+            sources, targets = (chains, location), (chains, location + direction)
+            if delta is not None:
+                new_energies = energies + delta(flat, sources, targets)
+            else:
+                new_densities = array(flat)
+                new_densities[sources] -= 1
+                new_densities[targets] += 1
+                new_energies = array(batch(new_densities.reshape(densities.shape)), dtype=float)
+
+            accept = self.accept_changes(energies, new_energies)
+            # Each chain moves at most one particle, so indices are not repeated
+            flat[chains[accept], location[accept]] -= 1
+            flat[chains[accept], location[accept] + direction[accept]] += 1
+            energies[accept] = new_energies[accept]
+
+            if not self.observe(iteration, accept, densities, energies): break
+
+            iteration += 1
+
+        return densities, energies
+
+    def observe(self, iteration, accepted, densities, energies):
+        """ Called at every step to observe all chains at once.
+
+            The arrays are modified as the simulation runs, so should be
+            copied to be kept.
+
+            :returns: True if simulation should keep going.
+        """
+        return True
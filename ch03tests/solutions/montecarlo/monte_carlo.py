@@ -1,6 +1,46 @@
+from math import exp
+
+import numpy as np
+
+from compiled import diffusion_kernel
+from particle_index import ParticleIndex
+from random_blocks import RandomBlocks
+
+
+def local_energy(energy):
+    """ The energy's local update method, if it has one, else None.
+
+        A local energy has a method ``delta(density, source, target)`` giving
+        the change in energy when one particle moves from source to target,
+        without recomputing the energy of the whole density. It is given the
+        flattened density, and sites as indices into it. The method is
+        looked up on the type, so that mocks, which have any attribute asked
+        of them, are not taken for local energies.
+    """
+    if getattr(type(energy), 'delta', None) is None: return None
+    return energy.delta
+
+
+def is_diffusion(energy):
+    """ True if energy is the diffusion model's, which MonteCarlo can compile.
+
+        Such energies are marked with a class attribute ``diffusion = True``,
+        and have a ``coefficient``, see diffusion_model.DiffusionEnergy.
+    """
+    return getattr(type(energy), 'diffusion', False) is True and hasattr(energy, 'coefficient')
+
+
 class MonteCarlo(object):
-    """ A simple Monte Carlo implementation """
-    def __init__(self, temperature=100, itermax=100):
+    """ A simple Monte Carlo implementation
+
+        The density can be a lattice of any dimension. By default, each step
+        costs O(L) operations on a lattice of L sites: picking a particle scans
+        the density, and an accepted move copies it. Only with both `indexed`
+        and `inplace` does a step cost O(log L), which is what large lattices
+        need.
+    """
+    def __init__(self, temperature=100, itermax=100, inplace=False, indexed=False,
+                 random=None, jit=False, periodic=False):
     
         if temperature == 0: raise NotImplementedError("Zero temperature not implemented")
         if temperature < 0e0: raise ValueError("Negative temperature makes no sense")
@@ -9,69 +49,223 @@ class MonteCarlo(object):
         """ Temperature at which to run simulation """
         self.itermax = itermax
         """ Maximum number of iterations """
+        self.inplace = inplace
+        """ Whether to move particles in place, undoing rejected moves.
 
-    def change_density(self, density):
-        """ Move one particle left or right. """
-        from numpy import sum, array
-        from numpy.random import randint, choice
-
-        # Particle index
-        particle = randint(sum(density))
-        # Location
-        current = 0
-        for location, n in enumerate(density):
-            current += n
-            if n > particle: break
-
-        # Move direction
-        if location == 0: direction = 1
-        elif location == len(density) - 1: direction = -1
+            Saves copying the density at every step. But then the density
+            given to `observe` changes as the simulation runs, so observers
+            must copy it if they want to keep it.
+        """
+        self.indexed = indexed
+        """ Whether to pick particles with a `ParticleIndex`.
+
+            Picking a particle then takes O(log L) rather than O(L) operations,
+            for a lattice of L sites, which pays off on long lattices.
+        """
+        self.particles = None
+        """ `ParticleIndex` of the current density, during indexed runs """
+        self.random = None if random is None else RandomBlocks(random)
+        """ Source of random numbers, if not numpy's global random state.
+
+            Given as a seed or a numpy Generator, random numbers are then drawn
+            a block at a time, see `RandomBlocks`.
+        """
+        self.jit = jit
+        """ Whether to run the diffusion model's energy with compiled code.
+
+            The whole loop is then compiled with Numba, if installed. It only
+            applies to runs with a diffusion energy, see `is_diffusion`, a
+            finite number of iterations, no observer, and a 1-dimensional
+            lattice without periodic boundaries. Other runs, or runs without
+            Numba, use the python loop.
+        """
+        self.periodic = periodic
+        """ Whether the lattice wraps around at its edges, along every axis """
+
+    def random_move(self, density):
+        """ Picks a particle, and a site next to it to move it to.
+
+            Sites are indices into the flattened density, so the same code
+            works on lattices of any dimension.
+
+            :returns: (source, target) sites of the particle and of its move.
+        """
+        randint = np.random.randint if self.random is None else self.random.randint
+
+        density = np.asarray(density)
+        if self.particles is not None:
+            source = self.particles.find(randint(self.particles.total))
+        else:
+            # Particle index
+            particle = randint(density.sum())
+            # Location
+            current = 0
+            for source, n in enumerate(density.flat):
+                current += n
+                if current > particle: break
+
+        return source, self.neighbour(density.shape, source)
+
+    def neighbour(self, shape, site):
+        """ Random site next to site, on a lattice of the given shape.
+
+            Picks an axis, then a direction along it. Without periodic
+            boundaries, particles on the edge of the lattice can only move
+            back in.
+        """
+        if self.random is None: randint, choice = np.random.randint, np.random.choice
+        else: randint, choice = self.random.randint, self.random.choice
+
+        if len(shape) == 1: axis = 0
+        else:
+            axes = [axis for axis, length in enumerate(shape) if length > 1]
+            axis = axes[randint(len(axes))]
+        stride = 1
+        for length in shape[axis + 1:]: stride *= length
+        length = shape[axis]
+        coordinate = (site // stride) % length
+
+        if self.periodic: direction = choice([-1, 1])
+        elif coordinate == 0: direction = 1
+        elif coordinate == length - 1: direction = -1
         else: direction = choice([-1, 1])
+        return site + ((coordinate + direction) % length - coordinate) * stride
 
-        # Now make change 
-        result = array(density)
-        result[location] -= 1
-        result[location + direction]  += 1
+    def change_density(self, density):
+        """ Move one particle to a neighbouring site. """
+        density = np.asarray(density)
+        source, target = self.random_move(density)
+        return self.moved(density, source, target)
+
+    def moved(self, density, source, target):
+        """ Copy of the density, with one particle moved. """
+        result = np.array(density)
+        self.move(result, source, target)
         return result
 
+    def move(self, density, source, target):
+        """ Moves one particle, modifying the density in place. """
+        density.flat[source] -= 1
+        density.flat[target]  += 1
+
     def accept_change(self, prior, successor): 
         """ Returns true if should accept change. """
-        from numpy import exp
-        from numpy.random import uniform
         if successor <= prior: return True
+        uniform = np.random.uniform if self.random is None else self.random.uniform
         return exp(-(successor - prior) / self.temperature) > uniform()
 
-    def __call__(self, energy, density):
-        """ Runs Monte-carlo """
+    def __call__(self, energy, density, start=0):
+        """ Runs Monte-carlo
+
+            :Parameters:
+              start: integer
+                Iteration to start counting from, when resuming a run.
+            :returns: The final density and its energy.
+        """
         from numpy import any, array
 
         density = array(density)
-        if len(density) < 2: 
+        if density.size < 2: 
             raise ValueError("Density is too short")
         # of the right kind (integer). Unless it is zero length, in which case type does not matter.
-        if density.dtype.kind != 'i' and len(density) > 0:
+        if density.dtype.kind != 'i' and density.size > 0:
             raise TypeError("Density should be an array of *integers*.")
         # and the right values (positive or null)
         if any(density < 0):
             raise ValueError("Density should be an array of *positive* integers.")
-        if density.ndim != 1:
-            raise ValueError("Density should be an a *1-dimensional* array of positive integers.")
-        if sum(density) == 0: 
+        if density.sum() == 0: 
             raise ValueError("Density is empty.")
 
-        iteration = 0
+        if self.jit and self.itermax >= 0 and is_diffusion(energy) and not self.observed \
+                and density.ndim == 1 and not self.periodic:
+            kernel = diffusion_kernel()
+            if kernel is not None: return self.compiled(kernel, energy, density, start)
+
+        iteration = start
         current_energy = energy(density)
-        while iteration < self.itermax or self.itermax < 0:
+        delta = local_energy(energy)
+        if self.indexed: self.particles = ParticleIndex(density)
+        try:
+            while iteration < self.itermax or self.itermax < 0:
+
+                if self.inplace: accept, current_energy = self.step_inplace(energy, delta, density, current_energy)
+                else: accept, density, current_energy = self.step(energy, delta, density, current_energy)
+
+                if not self.observe(iteration, accept, density, current_energy): break
+
+                iteration += 1
+        finally:
+            self.particles = None
+        return density, current_energy
+
+    @property
+    def observed(self):
+        """ Whether observe has been replaced, on the instance or in a subclass. """
+        return 'observe' in vars(self) or type(self).observe is not MonteCarlo.observe
 
+    def compiled(self, kernel, energy, density, start=0):
+        """ Runs the compiled loop, for the diffusion energy.
+
+            :returns: The final density and its energy.
+        """
+        from numpy import int64
+        from numpy.random import randint
+
+        # Numba's random numbers are seeded from ours, for reproducible runs
+        if self.random is not None: seed = self.random.randint(2**31)
+        else: seed = randint(2**31)
+        density = density.astype(int64)
+        current_energy, _ = kernel(density, float(energy.coefficient), float(self.temperature),
+                                   max(self.itermax - start, 0), seed)
+        return density, current_energy
+
+    def step(self, energy, delta, density, current_energy):
+        """ Proposes and maybe accepts a move, on a new copy of the density.
+
+            :returns: (accepted, density, energy) after the step.
+        """
+        if delta is None and self.particles is None:
             new_density = self.change_density(density)
             new_energy = energy(new_density)
-
             accept = self.accept_change(current_energy, new_energy)
-            if accept: density, current_energy = new_density, new_energy
+            if not accept: return accept, density, current_energy
+            return accept, new_density, new_energy
 
-            if not self.observe(iteration, accept, density, current_energy): break
+        source, target = self.random_move(density)
+        if delta is None:
+            new_density = self.moved(density, source, target)
+            new_energy = energy(new_density)
+        else:
+            # Only the two sites involved in the move change the energy
+            new_energy = current_energy + delta(density.reshape(-1), source, target)
+
+        accept = self.accept_change(current_energy, new_energy)
+        if not accept: return accept, density, current_energy
+        if delta is not None: new_density = self.moved(density, source, target)
+        if self.particles is not None: self.particles.move(source, target)
+        return accept, new_density, new_energy
+
+    def step_inplace(self, energy, delta, density, current_energy):
+        """ Proposes and maybe accepts a move, modifying the density in place.
+
+            Rejected moves are undone.
+
+            :returns: (accepted, energy) after the step.
+        """
+        source, target = self.random_move(density)
+        if delta is None:
+            self.move(density, source, target)
+            new_energy = energy(density)
+        else:
+            new_energy = current_energy + delta(density.reshape(-1), source, target)
+            self.move(density, source, target)
 
-            iteration += 1
+        accept = self.accept_change(current_energy, new_energy)
+        if not accept:
+            self.move(density, target, source)
+            return accept, current_energy
+        if self.particles is not None: self.particles.move(source, target)
+        return accept, new_energy
 
     def observe(self, iteration, accepted, density, energy):
         """ Called at every step to observe simulation. 
@@ -0,0 +1,54 @@
+class ParticleIndex(object):
+    """ Cumulative particle counts over a lattice, updated as particles move.
+
+        A Fenwick, or binary indexed, tree: entry i holds the number of
+        particles over a range of sites ending at site i, whose length is the
+        lowest set bit of i + 1. Moving a particle, and finding the site of
+        the n-th particle, then take O(log L) operations rather than O(L).
+    """
+    def __init__(self, density):
+        from numpy import array
+
+        counts = [int(n) for n in array(density).ravel()]
+        tree = list(counts)
+        for i in range(len(tree)):
+            parent = i | (i + 1)
+            if parent < len(tree): tree[parent] += tree[i]
+        self._tree = tree
+        """ Partial sums of the particle counts """
+        self.total = sum(counts)
+        """ Total number of particles """
+        self._top = 1 << (len(tree).bit_length() - 1) if len(tree) > 0 else 0
+        """ Largest power of two no greater than the number of sites """
+
+    def add(self, location, count):
+        """ Adds count particles at location, which may be negative. """
+        self.total += count
+        tree = self._tree
+        while location < len(tree):
+            tree[location] += count
+            location |= location + 1
+
+    def move(self, source, target):
+        """ Moves one particle from source to target. """
+        self.add(source, -1)
+        self.add(target, 1)
+
+    def find(self, particle):
+        """ Site of the given particle, counting particles from site 0.
+
+            :returns: The location such that there are at most ``particle``
+                particles before it, and more than ``particle`` up to and
+                including it.
+        """
+        if particle < 0 or particle >= self.total:
+            raise IndexError("Particle index out of range")
+        tree = self._tree
+        location, step = 0, self._top
+        # location counts the sites known to hold at most `particle` particles
+        while step > 0:
+            if location + step <= len(tree) and tree[location + step - 1] <= particle:
+                location += step
+                particle -= tree[location - 1]
+            step >>= 1
+        return location
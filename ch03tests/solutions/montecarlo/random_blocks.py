@@ -0,0 +1,55 @@
+class RandomBlocks(object):
+    """ Random numbers drawn in bulk from a numpy Generator.
+
+        Each call to numpy's random functions has an overhead which dwarfs the
+        cost of drawing a single number. Instead, uniform numbers are drawn a
+        block at a time, and handed out one by one as python floats. Integers
+        and choices are derived from them.
+
+        The stream depends only on the seed, so the same seed gives the same
+        simulation.
+    """
+    def __init__(self, seed=None, size=4096):
+        from numpy.random import default_rng
+
+        if size < 1: raise ValueError("Block size should be positive")
+
+        self.generator = default_rng(seed)
+        """ Generator the blocks are drawn from """
+        self.size = size
+        """ Number of random numbers drawn at a time """
+        self._block = []
+        """ Current block of uniform numbers """
+        self._next = 0
+        """ Index in the current block of the next number to hand out """
+
+    @property
+    def state(self):
+        """ State of the stream, as a dictionary of python numbers and lists.
+
+            Setting it back restarts the stream from where it was.
+        """
+        return {'generator': self.generator.bit_generator.state,
+                'block': self._block[self._next:]}
+
+    @state.setter
+    def state(self, state):
+        self.generator.bit_generator.state = state['generator']
+        self._block = list(state['block'])
+        self._next = 0
+
+    def uniform(self):
+        """ Uniform number in [0, 1). """
+        if self._next == len(self._block):
+            self._block = self.generator.random(self.size).tolist()
+            self._next = 0
+        self._next += 1
+        return self._block[self._next - 1]
+
+    def randint(self, high):
+        """ Integer in [0, high). """
+        return int(self.uniform() * high)
+
+    def choice(self, options):
+        """ One of the options, all equally likely. """
+        return options[int(self.uniform() * len(options))]
@@ -0,0 +1,129 @@
+from monte_carlo import MonteCarlo
+
+
+def run_replica(arguments):
+    """ Runs one replica for a number of steps, in a worker process.
+
+        :Parameters:
+          arguments: tuple
+            (energy, density, temperature, steps, seed)
+        :returns: The final density and its energy.
+    """
+    energy, density, temperature, steps, seed = arguments
+    montecarlo = MonteCarlo(temperature, itermax=steps, inplace=True, indexed=True, random=seed)
+    return montecarlo(energy, density)
+
+
+class ReplicaExchange(object):
+    """ Parallel tempering: Monte Carlo at several temperatures, with swaps.
+
+        One replica of the system runs at each temperature, each in its own
+        process. After every sweep of a given number of steps, neighbouring
+        temperatures propose to swap their densities. A swap is accepted with
+        probability ``min(1, exp((1/T_i - 1/T_j) (E_i - E_j)))``, which keeps
+        each replica at equilibrium at its own temperature. Densities stuck at
+        low temperatures can then escape by way of the high temperatures.
+    """
+    def __init__(self, temperatures, sweeps=100, steps=100, processes=None, random=None):
+        from numpy import any, array, diff
+        from numpy.random import default_rng
+
+        temperatures = array(temperatures, dtype=float)
+        if temperatures.ndim != 1 or len(temperatures) < 2:
+            raise ValueError("Need at least two temperatures")
+        if any(temperatures == 0): raise NotImplementedError("Zero temperature not implemented")
+        if any(temperatures < 0e0): raise ValueError("Negative temperature makes no sense")
+        if any(diff(temperatures) <= 0):
+            raise ValueError("Temperatures should be in increasing order")
+
+        self.temperatures = temperatures
+        """ Temperature of each replica, in increasing order """
+        self.sweeps = sweeps
+        """ Number of sweeps, each followed by swap proposals """
+        self.steps = steps
+        """ Number of Monte Carlo steps of each replica during a sweep """
+        self.processes = processes
+        """ Number of worker processes. Defaults to one per CPU, 1 runs in this process. """
+        self.random = default_rng(random)
+        """ numpy Generator for swaps, and for seeding each replica's sweeps """
+        self.attempted = None
+        """ Number of swaps proposed between each pair of neighbours, during the last run """
+        self.accepted = None
+        """ Number of swaps accepted between each pair of neighbours, during the last run """
+
+    @property
+    def acceptance(self):
+        """ Fraction of proposed swaps accepted between each pair of neighbours """
+        from numpy import maximum
+        return self.accepted / maximum(self.attempted, 1)
+
+    def swap(self, densities, energies, first):
+        """ Proposes swaps between every other pair of neighbours, starting from first.
+
+            Modifies the lists of densities and energies in place.
+        """
+        from numpy import exp
+
+        for i in range(first, len(self.temperatures) - 1, 2):
+            self.attempted[i] += 1
+            exponent = (1 / self.temperatures[i] - 1 / self.temperatures[i + 1]) \
+                * (energies[i] - energies[i + 1])
+            if exponent >= 0 or exp(exponent) > self.random.random():
+                self.accepted[i] += 1
+                densities[i], densities[i + 1] = densities[i + 1], densities[i]
+                energies[i], energies[i + 1] = energies[i + 1], energies[i]
+
+    def __call__(self, energy, density, replicas=False):
+        """ Runs parallel tempering, starting every replica from density.
+
+            :Parameters:
+              energy: callable
+                Energy of a density. It is sent to the worker processes, so
+                should be picklable, e.g. a module-level function or a
+                `DiffusionEnergy`.
+              density: array of positive integers
+                Initial density of all replicas, a lattice of any dimension.
+                Or, if replicas is true, the initial density of each replica,
+                stacked along the first axis.
+              replicas: boolean
+                Whether density holds one density per replica. It has to be
+                given, since a 2-dimensional density may be a single lattice.
+            :returns: The final densities and energies, from the lowest
+                temperature to the highest.
+        """
+        from multiprocessing import Pool
+        from numpy import array, zeros
+
+        density = array(density)
+        densities = list(density) if replicas else [density] * len(self.temperatures)
+        if len(densities) != len(self.temperatures):
+            raise ValueError("Need one density per temperature")
+        energies = [energy(d) for d in densities]
+        self.attempted = zeros(len(self.temperatures) - 1, dtype=int)
+        self.accepted = zeros(len(self.temperatures) - 1, dtype=int)
+
+        pool = Pool(self.processes) if self.processes != 1 else None
+        try:
+            for sweep in range(self.sweeps):
+                seeds = self.random.integers(2**63, size=len(densities))
+                tasks = [(energy, d, temperature, self.steps, seed)
+                         for d, temperature, seed in zip(densities, self.temperatures, seeds)]
+                results = pool.map(run_replica, tasks) if pool is not None else map(run_replica, tasks)
+                densities, energies = (list(values) for values in zip(*results))
+
+                # Alternate between even and odd pairs, so all pairs get a go
+                self.swap(densities, energies, sweep % 2)
+                if not self.observe(sweep, densities, energies): break
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        return densities, energies
+
+    def observe(self, sweep, densities, energies):
+        """ Called after every sweep and its swaps.
+
+            :returns: True if simulation should keep going.
+        """
+        return True
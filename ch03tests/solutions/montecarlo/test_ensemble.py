@@ -0,0 +1,99 @@
+""" Tests many Monte-Carlo chains run at once """
+
+from nose.tools import assert_equal, assert_almost_equal, assert_true, assert_raises
+from ensemble import Ensemble
+from test_monte_carlo import LocalEnergy
+
+def test_input_sanity():
+    """ Check incorrect input do fail """
+
+    with assert_raises(NotImplementedError) as exception: Ensemble(temperatures=[1e0, 0e0])
+    with assert_raises(ValueError) as exception: Ensemble(temperatures=[1e0, -1e0])
+
+    ensemble = Ensemble()
+    with assert_raises(TypeError) as exception: ensemble(lambda x: 0, [[1.0, 2, 3]])
+    with assert_raises(ValueError) as exception: ensemble(lambda x: 0, [[-1, 2, 3]])
+    with assert_raises(ValueError) as exception: ensemble(lambda x: 0, [1, 2, 3])
+    with assert_raises(ValueError) as exception: ensemble(lambda x: 0, [[3], [2]])
+    with assert_raises(ValueError) as exception: ensemble(lambda x: 0, [[1, 2], [0, 0]])
+
+def test_random_moves():
+    """ Checks each chain moves one of its particles, by one site, within bounds """
+    from numpy import array, sqrt
+
+    ensemble = Ensemble(random=1)
+    densities = array([[1, 0, 99], [0, 0, 5], [3, 0, 0], [0, 4, 0]])
+    moves_at_zero = 0
+    for i in range(10000):
+        location, direction = ensemble.random_moves(densities)
+        assert_true(all(densities[range(4), location] > 0))
+        assert_true(all(location + direction >= 0))
+        assert_true(all(location + direction < 3))
+        moves_at_zero += location[0] == 0
+    assert_true(abs(moves_at_zero - 100) < 5 * sqrt(100))
+
+class BatchEnergy(object):
+    """ Fake diffusion energy, computed for all chains at once """
+    def __call__(self, density):
+        raise AssertionError("Should use batch")
+
+    def batch(self, densities):
+        return 0.5 * (densities * (densities - 1)).sum(axis=1)
+
+def test_energies_follow_densities():
+    """ Checks every chain's energy matches its density, with and without local updates """
+    from numpy import array
+
+    energies = []
+    densities = []
+    def observe(iteration, accepted, current_densities, current_energies):
+        densities.append(array(current_densities))
+        energies.append(array(current_energies))
+        return len(energies) < 150
+
+    initial = [[5, 0, 3, 8, 1], [0, 0, 0, 0, 17], [1, 2, 3, 4, 5]]
+    for energy in [lambda x: 0.5 * (x * (x - 1)).sum(), LocalEnergy(), BatchEnergy()]:
+        del energies[:], densities[:]
+        ensemble = Ensemble(temperatures=[0.1, 1.0, 10.0], itermax=200, random=5)
+        ensemble.observe = observe
+        final, final_energies = ensemble(energy, initial)
+
+        assert_equal(len(energies), 150)
+        assert_equal(final.tolist(), densities[-1].tolist())
+        for chains, chain_energies in zip(densities, energies):
+            assert_equal(chains.sum(axis=1).tolist(), [17, 17, 15])
+            for density, current in zip(chains, chain_energies):
+                assert_almost_equal(current, 0.5 * (density * (density - 1)).sum())
+
+def test_lattice_chains():
+    """ Checks chains on 2 and 3-dimensional lattices move to neighbouring sites """
+    from numpy import array, nonzero, unravel_index
+    from numpy.random import randint
+
+    for shape in [(6, 5), (3, 4, 2)]:
+        initial = randint(4, size=(3,) + shape)
+        initial[:, 0] += 1
+        for periodic in [False, True]:
+            for energy in [lambda x: 0.5 * (x * (x - 1)).sum(), LocalEnergy()]:
+                densities = [array(initial)]
+                def observe(iteration, accepted, current_densities, current_energies):
+                    densities.append(array(current_densities))
+                    for density, current in zip(current_densities, current_energies):
+                        assert_almost_equal(current, 0.5 * (density * (density - 1)).sum())
+                    return True
+                ensemble = Ensemble(temperatures=1.0, itermax=100, random=2, periodic=periodic)
+                ensemble.observe = observe
+                final, _ = ensemble(energy, initial)
+                assert_equal(final.shape, initial.shape)
+
+                for before, after in zip(densities[:-1], densities[1:]):
+                    for chain_before, chain_after in zip(before, after):
+                        change = (chain_before - chain_after).ravel()
+                        if not change.any(): continue
+                        source = array(unravel_index(nonzero(change == 1)[0][0], shape))
+                        target = array(unravel_index(nonzero(change == -1)[0][0], shape))
+                        steps = abs(source - target)
+                        moved = nonzero(steps)[0]
+                        assert_equal(len(moved), 1)
+                        length = shape[moved[0]]
+                        assert_true(steps[moved[0]] == 1 or (periodic and steps[moved[0]] == length - 1))
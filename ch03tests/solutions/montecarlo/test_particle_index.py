@@ -0,0 +1,35 @@
+""" Tests cumulative particle counts """
+
+from nose.tools import assert_equal, assert_raises
+from particle_index import ParticleIndex
+
+def test_find_particles():
+    """ Checks each particle is found at its site """
+    density = [0, 3, 0, 0, 1, 2, 0]
+    index = ParticleIndex(density)
+    assert_equal(index.total, 6)
+    sites = [index.find(particle) for particle in range(6)]
+    assert_equal(sites, [1, 1, 1, 4, 5, 5])
+
+    with assert_raises(IndexError) as exception: index.find(6)
+    with assert_raises(IndexError) as exception: index.find(-1)
+
+def test_move_particles():
+    """ Checks the index follows random moves, compared to a plain scan """
+    from numpy import cumsum, searchsorted
+    from numpy.random import randint
+
+    for i in range(20):
+        density = randint(5, size=randint(2, 40))
+        density[0] += 1
+        index = ParticleIndex(density)
+        for j in range(50):
+            particle = randint(density.sum())
+            location = index.find(particle)
+            assert_equal(location, searchsorted(cumsum(density), particle, side='right'))
+
+            direction = 1 if location < len(density) - 1 else -1
+            index.move(location, location + direction)
+            density[location] -= 1
+            density[location + direction] += 1
+        assert_equal(index.total, density.sum())
@@ -0,0 +1,42 @@
+""" Tests random numbers drawn in blocks """
+
+from nose.tools import assert_equal, assert_true, assert_raises
+from random_blocks import RandomBlocks
+
+def test_same_stream_across_blocks():
+    """ Checks the stream does not depend on the block size """
+    from numpy.random import default_rng
+
+    expected = default_rng(7).random(100).tolist()
+    for size in [1, 3, 64, 1000]:
+        random = RandomBlocks(7, size)
+        assert_equal([random.uniform() for i in range(100)], expected)
+
+    with assert_raises(ValueError) as exception: RandomBlocks(7, 0)
+
+def test_integers_and_choices():
+    """ Checks integers and choices are in range and roughly uniform """
+    from numpy import bincount, sqrt
+
+    random = RandomBlocks(11)
+    integers = [random.randint(5) for i in range(10000)]
+    counts = bincount(integers)
+    assert_equal(len(counts), 5)
+    assert_true(all(abs(counts - 2000) < 5 * sqrt(2000)))
+
+    choices = [random.choice([-1, 1]) for i in range(10000)]
+    assert_equal(set(choices), {-1, 1})
+    assert_true(abs(choices.count(1) - 5000) < 5 * sqrt(5000))
+
+def test_restore_state():
+    """ Checks the stream carries on from a saved state, mid-block """
+    from json import dumps, loads
+
+    random = RandomBlocks(3, 10)
+    [random.uniform() for i in range(15)]
+    state = loads(dumps(random.state))
+    expected = [random.uniform() for i in range(30)]
+
+    restored = RandomBlocks(None, 10)
+    restored.state = state
+    assert_equal([restored.uniform() for i in range(30)], expected)
@@ -0,0 +1,49 @@
+""" Tests parallel tempering """
+
+from nose.tools import assert_equal, assert_almost_equal, assert_raises
+from tempering import ReplicaExchange
+from test_monte_carlo import LocalEnergy
+
+def test_input_sanity():
+    """ Check incorrect input do fail """
+
+    with assert_raises(ValueError) as exception: ReplicaExchange([1e0])
+    with assert_raises(NotImplementedError) as exception: ReplicaExchange([0e0, 1e0])
+    with assert_raises(ValueError) as exception: ReplicaExchange([-1e0, 1e0])
+    with assert_raises(ValueError) as exception: ReplicaExchange([2e0, 1e0])
+
+    tempering = ReplicaExchange([1e0, 2e0], processes=1)
+    with assert_raises(ValueError) as exception: tempering(LocalEnergy(), [[1, 2], [3, 4], [5, 6]], replicas=True)
+
+def test_swaps():
+    """ Checks swaps are always accepted when they lower the energy """
+    tempering = ReplicaExchange([1e0, 2e0, 4e0], random=0)
+    tempering.attempted = [0, 0]
+    tempering.accepted = [0, 0]
+
+    # Higher energy at lower temperature: swapping is always favourable
+    densities, energies = ['a', 'b', 'c'], [10.0, 0.0, 5.0]
+    tempering.swap(densities, energies, 0)
+    assert_equal(densities, ['b', 'a', 'c'])
+    assert_equal(energies, [0.0, 10.0, 5.0])
+    assert_equal(list(tempering.acceptance), [1, 0])
+
+    # A very unfavourable swap is never accepted
+    densities, energies = ['a', 'b', 'c'], [0.0, 0.0, 1e6]
+    tempering.swap(densities, energies, 1)
+    assert_equal(densities, ['a', 'b', 'c'])
+    assert_equal(list(tempering.acceptance), [1, 0])
+
+def test_runs_are_reproducible():
+    """ Checks runs depend only on the seed, whether in processes or not """
+    results = []
+    for processes in [1, 2]:
+        tempering = ReplicaExchange([0.1, 1.0, 10.0], sweeps=10, steps=50,
+                                    processes=processes, random=4)
+        densities, energies = tempering(LocalEnergy(), [5, 0, 3, 8, 1])
+        for density, current in zip(densities, energies):
+            assert_equal(density.sum(), 17)
+            assert_almost_equal(current, 0.5 * (density * (density - 1)).sum())
+        assert_equal(list(tempering.attempted), [5, 5])
+        results.append(([list(d) for d in densities], energies, list(tempering.accepted)))
+    assert_equal(results[0], results[1])
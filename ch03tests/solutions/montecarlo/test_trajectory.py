@@ -0,0 +1,75 @@
+""" Tests saving and resuming Monte-Carlo runs """
+
+from nose.tools import assert_equal, assert_true, assert_raises
+from monte_carlo import MonteCarlo
+from trajectory import Checkpoint, Trajectory, observers, resume
+from test_monte_carlo import LocalEnergy
+
+def read(filename):
+    """ Iterations, acceptances, energies and densities in a trajectory file """
+    from numpy import load
+    if filename.endswith(".h5"):
+        from h5py import File
+        with File(filename, "r") as input:
+            return [input[name][:].tolist() for name in ["iteration", "accepted", "energy", "density"]]
+    records = load(filename)
+    return [records[name].tolist() for name in ["iteration", "accepted", "energy", "density"]]
+
+def test_trajectory_thinning(tmp_path):
+    """ Checks every n-th snapshot is written, whatever the chunk size """
+    from numpy import array
+    from pytest import importorskip
+
+    snapshots = [(i, i % 3 == 0, float(i), array([i, 17 - i])) for i in range(17)]
+    for extension in [".npy", ".h5"]:
+        if extension == ".h5": importorskip("h5py")
+        for chunk in [1, 4, 100]:
+            filename = str(tmp_path / ("trajectory%i%s" % (chunk, extension)))
+            with Trajectory(filename, every=5, chunk=chunk) as trajectory:
+                for iteration, accepted, energy, density in snapshots:
+                    assert_true(trajectory(iteration, accepted, density, energy))
+
+            iterations, accepted, energies, densities = read(filename)
+            assert_equal(iterations, [0, 5, 10, 15])
+            assert_equal(accepted, [True, False, False, True])
+            assert_equal(energies, [0.0, 5.0, 10.0, 15.0])
+            assert_equal(densities, [[0, 17], [5, 12], [10, 7], [15, 2]])
+
+def test_checkpoint_needs_own_random_numbers(tmp_path):
+    """ Checks runs on the global random state are not checkpointed """
+    with assert_raises(ValueError) as exception: Checkpoint(str(tmp_path / "run.npz"), MonteCarlo())
+
+def test_resume_after_interruption(tmp_path):
+    """ Checks an interrupted run carries on as if it had not stopped """
+    from pytest import importorskip
+
+    def run(directory, stop=None):
+        filename = str(directory / ("trajectory" + extension))
+        trajectory = Trajectory(filename, every=3, chunk=8)
+        mc = MonteCarlo(temperature=1.0, itermax=300, random=9, inplace=True, indexed=True)
+        checkpoint = Checkpoint(str(directory / "run.npz"), mc, every=40, trajectory=trajectory)
+        mc.observe = observers(trajectory, checkpoint, lambda *args: args[0] != stop)
+        result = mc(LocalEnergy(), [5, 0, 3, 8, 1])
+        trajectory.close()
+        return mc, trajectory, checkpoint, result
+
+    for extension in [".npy", ".h5"]:
+        if extension == ".h5": importorskip("h5py")
+        (tmp_path / extension[1:]).mkdir()
+        (tmp_path / extension[1:] / "interrupted").mkdir()
+
+        _, full, _, (density, energy) = run(tmp_path / extension[1:])
+        _, interrupted, checkpoint, _ = run(tmp_path / extension[1:] / "interrupted", stop=150)
+        # The run was killed after the checkpoint at 120, but some of its
+        # trajectory was written after that
+        assert_true(max(read(interrupted.filename)[0]) > 120)
+
+        # Start again from a fresh process, as it were
+        mc = MonteCarlo(temperature=1.0, itermax=300, random=0, inplace=True, indexed=True)
+        mc.observe = observers(interrupted, Checkpoint(checkpoint.filename, mc, 40, interrupted))
+        resumed = resume(mc, LocalEnergy(), str(tmp_path / extension[1:] / "interrupted" / "run.npz"),
+                         interrupted)
+        interrupted.close()
+        assert_equal(resumed[0].tolist(), density.tolist())
+        assert_equal(resumed[1], energy)
+        assert_equal(read(interrupted.filename), read(full.filename))
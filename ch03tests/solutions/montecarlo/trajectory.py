@@ -0,0 +1,244 @@
+""" Saving Monte Carlo runs as they go, and resuming them.
+
+    A `Trajectory` records snapshots of a run to an HDF5 or ``.npy`` file,
+    appending a chunk at a time. A `Checkpoint` regularly saves all that is
+    needed to carry on a run: the density, the iteration and the state of the
+    random numbers. Both are called like `MonteCarlo.observe`, and can be
+    chained with `observers`.
+"""
+import os
+import struct
+from json import dumps, loads
+from tempfile import NamedTemporaryFile
+
+
+def observers(*functions):
+    """ Observer calling each function in turn, stopping if any says so. """
+    def observe(iteration, accepted, density, energy):
+        keep_going = True
+        for function in functions:
+            keep_going = function(iteration, accepted, density, energy) and keep_going
+        return keep_going
+    return observe
+
+
+class Trajectory(object):
+    """ Snapshots of a run, appended to a file.
+
+        Each snapshot holds the iteration, whether the move was accepted, the
+        energy and the density. Snapshots are kept in memory, then written a
+        chunk at a time, so that the file is not touched at every step.
+
+        Files ending in ``.h5`` or ``.hdf5`` are written with h5py, with one
+        resizable dataset per field. Anything else is a ``.npy`` file of
+        records with those fields. Existing files are appended to.
+    """
+    def __init__(self, filename, every=1, chunk=1024):
+        if every < 1: raise ValueError("Should record at least every step")
+        if chunk < 1: raise ValueError("Chunks should hold at least one snapshot")
+
+        self.filename = filename
+        """ Path to the output """
+        self.every = every
+        """ Records every n-th iteration only """
+        self.chunk = chunk
+        """ Number of snapshots held in memory before writing them out """
+        self._snapshots = []
+        """ Snapshots not yet written """
+
+    @property
+    def hdf5(self):
+        """ Whether the output is an HDF5 file """
+        return self.filename.endswith((".h5", ".hdf5"))
+
+    def __call__(self, iteration, accepted, density, energy):
+        """ Records the snapshot, if iteration is one to keep. """
+        from numpy import array
+
+        if iteration % self.every == 0:
+            self._snapshots.append((iteration, accepted, energy, array(density)))
+            if len(self._snapshots) >= self.chunk: self.flush()
+        return True
+
+    def flush(self):
+        """ Appends the snapshots held in memory to the file. """
+        if len(self._snapshots) == 0: return
+        if self.hdf5: self._append_hdf5()
+        else: self._append_npy()
+        self._snapshots = []
+
+    def discard_from(self, iteration):
+        """ Removes snapshots from the given iteration on, e.g. before resuming.
+
+            :returns: The number of snapshots left.
+        """
+        self._snapshots = [snapshot for snapshot in self._snapshots if snapshot[0] < iteration]
+        if not os.path.exists(self.filename): return len(self._snapshots)
+
+        if self.hdf5:
+            from h5py import File
+            with File(self.filename, "a") as output:
+                kept = int((output["iteration"][:] < iteration).sum())
+                for name in ["iteration", "accepted", "energy", "density"]:
+                    output[name].resize(kept, axis=0)
+        else:
+            from numpy import load
+            records = load(self.filename, mmap_mode="r")
+            kept = int((records["iteration"] < iteration).sum())
+            del records
+            with open(self.filename, "r+b") as output:
+                dtype, _, offset = self._read_npy_header(output)
+                output.truncate(offset + kept * dtype.itemsize)
+                self._write_npy_header(output, dtype, kept)
+        return kept + len(self._snapshots)
+
+    def _records(self):
+        """ Snapshots held in memory, as a numpy record array """
+        from numpy import array
+
+        shape = self._snapshots[0][3].shape
+        dtype = [("iteration", "<i8"), ("accepted", "?"), ("energy", "<f8"),
+                 ("density", "<i8", shape)]
+        return array(self._snapshots, dtype=dtype)
+
+    def _append_hdf5(self):
+        from h5py import File
+
+        records = self._records()
+        with File(self.filename, "a") as output:
+            for name in ["iteration", "accepted", "energy", "density"]:
+                values = records[name]
+                if name not in output:
+                    output.create_dataset(name, shape=(0,) + values.shape[1:], dtype=values.dtype,
+                                          maxshape=(None,) + values.shape[1:],
+                                          chunks=(self.chunk,) + values.shape[1:])
+                dataset = output[name]
+                dataset.resize(len(dataset) + len(values), axis=0)
+                dataset[-len(values):] = values
+
+    # A .npy file of n records has a header giving its shape as (n,). The
+    # header is written with room for any n, so it can be rewritten in place
+    # as records are appended at the end.
+    def _append_npy(self):
+        records = self._records()
+        mode = "r+b" if os.path.exists(self.filename) else "w+b"
+        with open(self.filename, mode) as output:
+            if mode == "w+b":
+                count = 0
+                self._write_npy_header(output, records.dtype, count)
+            else:
+                dtype, count, _ = self._read_npy_header(output)
+                if dtype != records.dtype:
+                    raise ValueError("Snapshots do not match those already in the file")
+            output.seek(0, os.SEEK_END)
+            output.write(records.tobytes())
+            self._write_npy_header(output, records.dtype, count + len(records))
+
+    @staticmethod
+    def _npy_header(dtype, count):
+        from numpy.lib.format import dtype_to_descr, magic
+
+        header = repr({"descr": dtype_to_descr(dtype), "fortran_order": False,
+                       "shape": (int(count),)})
+        widest = repr({"descr": dtype_to_descr(dtype), "fortran_order": False,
+                       "shape": (2**63,)})
+        # magic string, 2 bytes of header length, header, and a newline,
+        # aligned to 64 bytes
+        length = -(-(len(magic(1, 0)) + 2 + len(widest) + 1) // 64) * 64
+        padded = header.ljust(length - len(magic(1, 0)) - 2 - 1) + "\n"
+        return magic(1, 0) + struct.pack("<H", len(padded)) + padded.encode("latin1")
+
+    def _write_npy_header(self, output, dtype, count):
+        output.seek(0)
+        output.write(self._npy_header(dtype, count))
+
+    def _read_npy_header(self, output):
+        """ dtype and number of records of an open file, and where records start """
+        from numpy.lib.format import read_array_header_1_0, read_magic
+
+        output.seek(0)
+        read_magic(output)
+        (count,), _, dtype = read_array_header_1_0(output)
+        if output.tell() != len(self._npy_header(dtype, count)):
+            raise ValueError("Not a trajectory file written by Trajectory")
+        return dtype, count, output.tell()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Checkpoint(object):
+    """ Saves all that is needed to resume a run, every so many iterations.
+
+        The checkpoint holds the density, its energy, the next iteration and
+        the state of the run's random numbers. It is written to a temporary
+        file which then replaces the previous checkpoint, so a run killed
+        while saving still leaves a usable checkpoint.
+
+        Only runs drawing random numbers from `MonteCarlo.random` can be
+        resumed exactly, since numpy's global random state is shared with
+        everything else.
+    """
+    def __init__(self, filename, montecarlo, every=100000, trajectory=None):
+        if montecarlo.random is None:
+            raise ValueError("Checkpoints need a MonteCarlo with its own random numbers")
+        if every < 1: raise ValueError("Should checkpoint at least every step")
+
+        self.filename = filename
+        """ Path to the checkpoint, a ``.npz`` file """
+        self.montecarlo = montecarlo
+        """ Run being checkpointed """
+        self.every = every
+        """ Number of iterations between checkpoints """
+        self.trajectory = trajectory
+        """ Trajectory to flush before each checkpoint, so it is never behind """
+
+    def __call__(self, iteration, accepted, density, energy):
+        """ Saves a checkpoint after every n-th iteration. """
+        if (iteration + 1) % self.every == 0: self.save(iteration + 1, density, energy)
+        return True
+
+    def save(self, iteration, density, energy):
+        """ Saves the run, to carry on from the given iteration. """
+        from numpy import savez
+
+        if self.trajectory is not None: self.trajectory.flush()
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        with NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as output:
+            savez(output, density=density, energy=energy, iteration=iteration,
+                  random=dumps(self.montecarlo.random.state))
+        os.replace(output.name, self.filename)
+
+    @staticmethod
+    def load(filename):
+        """ Reads a checkpoint.
+
+            :returns: A dictionary with the density, energy, iteration and
+                random state.
+        """
+        from numpy import load
+
+        with load(filename) as stored:
+            return {"density": stored["density"], "energy": float(stored["energy"]),
+                    "iteration": int(stored["iteration"]),
+                    "random": loads(str(stored["random"]))}
+
+
+def resume(montecarlo, energy, filename, trajectory=None):
+    """ Carries on a run from its last checkpoint.
+
+        Snapshots the trajectory recorded after the checkpoint are discarded,
+        since the run is about to record them again.
+
+        :returns: The final density and its energy, as `MonteCarlo` does.
+    """
+    checkpoint = Checkpoint.load(filename)
+    montecarlo.random.state = checkpoint["random"]
+    if trajectory is not None: trajectory.discard_from(checkpoint["iteration"])
+    return montecarlo(energy, checkpoint["density"], start=checkpoint["iteration"])
@@ -189,6 +189,44 @@ data = [[mandel1(complex(x, y)) for x in xs] for y in ys]  # just run
 # gives performance gains for signifantly large computations. As always, it is
 # good to measure the performance to check if there are any gains.
 
+# %% [markdown]
+# The early exits for points inside the set, from the previous lesson, compile just
+# as well: Numba understands `.real`, `.imag` and comparisons of complex numbers.
+
+# %%
+@njit
+def mandel1_fast(position, limit=50):
+    x, y = position.real, position.imag
+    q = (x - 0.25)**2 + y**2
+    if q * (q + (x - 0.25)) < 0.25 * y**2 or (x + 1)**2 + y**2 < 0.0625:
+        return 0
+
+    value = position
+    saved = value
+    period = 0
+    power = 1
+    while abs(value) < 2:
+        limit -= 1
+        value = value**2 + position
+        if limit < 0:
+            return 0
+        if value == saved:
+            return 0
+        period += 1
+        if period == power:
+            saved = value
+            period = 0
+            power *= 2
+    return limit
+
+# %%
+# %%timeit
+data = [[mandel1(complex(x, y), 1000) for x in xs] for y in ys]
+
+# %%
+# %%timeit
+data = [[mandel1_fast(complex(x, y), 1000) for x in xs] for y in ys]
+
 # %% [markdown]
 # Let's try JITting our NumPy code.
 
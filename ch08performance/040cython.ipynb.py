@@ -143,6 +143,44 @@ axarr[1].set_title('Cython')
 # cython with typed variable + function
 # %timeit a = call_typed_mandel_cython(complex(0, 0))
 
+# %% [markdown]
+# `complex(0, 0)` is inside the set, so all of these run to the limit. Typed Cython can also skip interior points early, by testing for the main cardioid and period-2 bulb, and by spotting periodic orbits:
+
+# %% language="cython"
+# cpdef fast_mandel_cython(double complex position, int limit=50):
+#     cdef double x = position.real
+#     cdef double y = position.imag
+#     cdef double q = (x - 0.25)**2 + y**2
+#     cdef double complex value, saved
+#     cdef int period, power
+#     if q * (q + (x - 0.25)) < 0.25 * y**2 or (x + 1)**2 + y**2 < 0.0625:
+#         return 0
+#     value = position
+#     saved = value
+#     period = 0
+#     power = 1
+#     while abs(value) < 2:
+#         limit -= 1
+#         value = value**2 + position
+#         if limit < 0:
+#             return 0
+#         if value == saved:
+#             return 0
+#         period += 1
+#         if period == power:
+#             saved = value
+#             period = 0
+#             power *= 2
+#     return limit
+
+# %%
+# cython with early exits
+# %timeit a = fast_mandel_cython(complex(0, 0))
+
+# %%
+# %timeit [[call_typed_mandel_cython(complex(x, y), 1000) for x in xs] for y in ys]
+# %timeit [[fast_mandel_cython(complex(x, y), 1000) for x in xs] for y in ys]
+
 # %% [markdown]
 # ## Cython with numpy ndarray
 # You can use NumPy from Cython exactly the same as in regular Python, but by doing so you are losing potentially high speedups because Cython has support for fast access to NumPy arrays. 
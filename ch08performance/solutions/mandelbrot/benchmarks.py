@@ -0,0 +1,338 @@
+""" Times the Mandelbrot kernels against each other
+
+    Run as ``python benchmarks.py`` from this directory, see ``--help``. Every
+    kernel from the lessons is run over a sweep of resolutions and limits,
+    checked against mandel5, and timed. The results table, with time, pixels
+    per second and peak memory, can be saved as CSV or JSON to track
+    regressions.
+
+    Numba and Cython kernels are only included if those packages are
+    installed.
+"""
+import csv
+import json
+import tracemalloc
+import warnings
+from argparse import ArgumentParser
+from timeit import repeat
+
+import numpy as np
+
+from mandelbrot import (mandel1, mandel1_fast, mandel4, mandel5,
+                        mandel_active, mandel_inplace, positions)
+from progressive import render_progressive
+
+LESSON_DOMAIN = (-1.5, 0.5, -1.0, 1.0)
+""" (xmin, xmax, ymin, ymax) used throughout the lessons """
+
+
+def best_time(function, number=1, repeats=3):
+    """ Best time, in seconds, of calling function over a few repeats """
+    return min(repeat(function, number=number, repeat=repeats)) / number
+
+
+def time_kernel(kernel, values, limit, number=1, repeats=3):
+    """ Best time, in seconds, of ``kernel(values, limit)`` over a few repeats """
+    return best_time(lambda: kernel(values, limit), number, repeats)
+
+
+def compare_active(limits=(50, 200, 1000, 5000), resolution=300,
+                   domain=LESSON_DOMAIN):
+    """ Times mandel5 and mandel_active over a range of limits
+
+        :returns: list of (limit, mandel5 seconds, mandel_active seconds)
+    """
+    values = positions(*domain, resolution)
+    return [(limit, time_kernel(mandel5, values, limit),
+             time_kernel(mandel_active, values, limit))
+            for limit in limits]
+
+
+def compare_progressive(limits=(50, 500, 5000), resolution=300,
+                        domain=LESSON_DOMAIN, coarse=8):
+    """ Times mandel5 and render_progressive over a range of limits
+
+        :returns: list of (limit, mandel5 seconds, progressive seconds,
+            fraction of pixels iterated, number of pixels that differ)
+    """
+    values = positions(*domain, resolution)
+    results = []
+    for limit in limits:
+        image, iterated = render_progressive(*domain, resolution, limit,
+                                             coarse=coarse)
+        differ = (image != mandel5(values, limit)).sum()
+        results.append((
+            limit, time_kernel(mandel5, values, limit),
+            best_time(lambda: render_progressive(*domain, resolution, limit,
+                                                 coarse=coarse)),
+            iterated, differ))
+    return results
+
+
+def compare_inplace(limits=(50, 500, 5000), resolution=300,
+                    domain=LESSON_DOMAIN):
+    """ Times mandel_inplace, in double and single precision, against mandel5
+
+        Also reports how far single precision is from the double precision
+        counts.
+
+        :returns: list of (limit, mandel5 seconds, complex128 seconds,
+            complex64 seconds, fraction of pixels that differ in complex64,
+            largest difference in escape count in complex64)
+    """
+    values = positions(*domain, resolution)
+    results = []
+    for limit in limits:
+        single = mandel_inplace(values, limit, np.complex64)
+        differences = np.abs(single - mandel5(values, limit))
+        results.append((
+            limit, time_kernel(mandel5, values, limit),
+            time_kernel(mandel_inplace, values, limit),
+            best_time(lambda: mandel_inplace(values, limit, np.complex64)),
+            np.count_nonzero(differences) / differences.size,
+            differences.max()))
+    return results
+
+
+def _axes(values):
+    """ The xs and ys lists the pure python loops iterate over """
+    return list(values[0].real), list(values[:, 0].imag)
+
+
+def list_comprehension(kernel):
+    """ Loops over the grid with a list comprehension, as in data1 """
+    def run(values, limit):
+        xs, ys = _axes(values)
+        return [[kernel(complex(x, y), limit) for x in xs] for y in ys]
+    return run
+
+
+def appending(kernel):
+    """ Loops over the grid appending to lists, as in data2 """
+    def run(values, limit):
+        xs, ys = _axes(values)
+        data = []
+        for y in ys:
+            row = []
+            for x in xs:
+                row.append(kernel(complex(x, y), limit))
+            data.append(row)
+        return data
+    return run
+
+
+def preallocated(kernel):
+    """ Loops over the grid filling preallocated lists, as in data3 """
+    def run(values, limit):
+        xs, ys = _axes(values)
+        data = [[0 for x in xs] for y in ys]
+        for j, y in enumerate(ys):
+            for i, x in enumerate(xs):
+                data[j][i] = kernel(complex(x, y), limit)
+        return data
+    return run
+
+
+def mapping(kernel):
+    """ Loops over the grid mapping over each row, as in data4 """
+    def run(values, limit):
+        xs, ys = _axes(values)
+        data = []
+        for y in ys:
+            data.append(list(map(lambda x: kernel(complex(x, y), limit), xs)))
+        return data
+    return run
+
+
+def numba_kernels():
+    """ The Numba kernels from the lessons, if Numba is installed """
+    try:
+        from numba import njit
+    except ImportError:
+        return {}
+
+    def flat_mandel_numpy(position, limit=50):
+        # mandel_numpy, as adjusted for Numba in the lesson
+        value = position.flatten()
+        diverged_at_count = np.zeros(position.shape).flatten()
+        while limit > 0:
+            limit -= 1
+            value = value**2 + position.flatten()
+            diverging = (value * np.conj(value)).real > 4
+            first_diverged_this_time = (np.logical_and(diverging, diverged_at_count == 0))
+            diverged_at_count[first_diverged_this_time] = limit
+            value[diverging] = 2
+
+        return diverged_at_count.reshape(position.shape)
+
+    return {
+        "numba mandel1": list_comprehension(njit(mandel1)),
+        "numba mandel1_fast": list_comprehension(njit(mandel1_fast)),
+        "numba mandel_numpy": njit(flat_mandel_numpy),
+    }
+
+
+def cython_kernels():
+    """ The Cython kernels from the lessons, if Cython is installed
+
+        If the kernels fail to compile, e.g. without a C compiler, they are
+        skipped with a warning, rather than stopping the whole suite.
+    """
+    try:
+        import pyximport
+    except ImportError:
+        return {}
+    try:
+        pyximport.install(language_level=3)
+        from mandel_cython import mandel_cython, call_typed_mandel_cython
+    except Exception as error:
+        warnings.warn(f"Skipping the Cython kernels, which failed to build: {error}")
+        return {}
+    return {
+        "cython mandel_cython": list_comprehension(mandel_cython),
+        "cython typed": list_comprehension(call_typed_mandel_cython),
+    }
+
+
+def all_kernels():
+    """ Every kernel, by name, as functions of an array of positions and a limit
+
+        Only kernels expected to match mandel5 exactly are included, so
+        mandel_inplace in single precision is left to ``--compare inplace``.
+    """
+    vectorized = np.vectorize(mandel1)
+    kernels = {
+        "mandel1 list comprehension": list_comprehension(mandel1),
+        "mandel1 append": appending(mandel1),
+        "mandel1 preallocated": preallocated(mandel1),
+        "mandel1 map": mapping(mandel1),
+        "mandel1_fast": list_comprehension(mandel1_fast),
+        "np.vectorize(mandel1)": lambda values, limit: vectorized(values, limit),
+        "mandel4": mandel4,
+        "mandel5": mandel5,
+        "mandel_active": mandel_active,
+        "mandel_inplace": mandel_inplace,
+    }
+    kernels.update(numba_kernels())
+    kernels.update(cython_kernels())
+    return kernels
+
+
+def peak_memory(function):
+    """ Result of calling function, and the peak memory it allocated, in bytes
+
+        NumPy reports its allocations to tracemalloc, but memory allocated
+        inside compiled Numba or Cython code may not be seen.
+    """
+    tracemalloc.start()
+    try:
+        result = function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def run_suite(kernels=None, resolutions=(100, 300), limits=(50, 200),
+              repeats=3, domain=LESSON_DOMAIN):
+    """ Checks and times each kernel for each resolution and limit
+
+        :Parameters:
+          kernels: dictionary
+            Kernels to run, by name. Defaults to all_kernels().
+        :returns: A list of dictionaries, one per kernel, resolution and
+            limit, with the time in seconds, pixels per second, peak memory in
+            bytes, and whether the counts match mandel5's.
+    """
+    kernels = all_kernels() if kernels is None else kernels
+    results = []
+    for resolution in resolutions:
+        values = positions(*domain, resolution)
+        for limit in limits:
+            expected = mandel5(values, limit)
+            for name, kernel in kernels.items():
+                # The first run also compiles Numba kernels, so is neither
+                # timed nor measured
+                counts = kernel(values, limit)
+                _, peak = peak_memory(lambda: kernel(values, limit))
+                seconds = time_kernel(kernel, values, limit, repeats=repeats)
+                results.append({
+                    "kernel": name,
+                    "resolution": resolution,
+                    "limit": limit,
+                    "seconds": seconds,
+                    "pixels_per_second": values.size / seconds,
+                    "peak_bytes": peak,
+                    "correct": bool(np.array_equal(counts, expected)),
+                })
+    return results
+
+
+def save_results(results, filename):
+    """ Writes the results table as JSON, or as CSV for other extensions """
+    with open(filename, "w", newline="") as output:
+        if filename.endswith(".json"):
+            json.dump(results, output, indent=2)
+        else:
+            writer = csv.DictWriter(output, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+
+def print_results(results):
+    """ Prints the results table """
+    print(f"{'kernel':<28} {'res':>5} {'limit':>6} {'seconds':>10} "
+          f"{'pixels/s':>10} {'peak MB':>8} {'correct':>7}")
+    for row in results:
+        print(f"{row['kernel']:<28} {row['resolution']:>5} {row['limit']:>6} "
+              f"{row['seconds']:>10.4f} {row['pixels_per_second']:>10.3g} "
+              f"{row['peak_bytes'] / 2**20:>8.1f} {str(row['correct']):>7}")
+
+
+def print_comparison(comparison):
+    """ Prints one of the focused comparisons against mandel5 """
+    if comparison == "active":
+        print(f"{'limit':>6} {'mandel5':>10} {'active':>10} {'speedup':>8}")
+        for limit, full, active in compare_active():
+            print(f"{limit:>6} {full:>10.4f} {active:>10.4f} {full / active:>8.1f}")
+    elif comparison == "progressive":
+        print(f"{'limit':>6} {'mandel5':>10} {'progress':>10} {'iterated':>8} {'differ':>6}")
+        for limit, full, progressive, iterated, differ in compare_progressive():
+            print(f"{limit:>6} {full:>10.4f} {progressive:>10.4f} {iterated:>8.1%} {differ:>6}")
+    elif comparison == "inplace":
+        print(f"{'limit':>6} {'mandel5':>10} {'inplace':>10} {'single':>10} {'differ':>8} {'max':>6}")
+        for limit, full, double, single, differ, largest in compare_inplace():
+            print(f"{limit:>6} {full:>10.4f} {double:>10.4f} {single:>10.4f} {differ:>8.2%} {largest:>6.0f}")
+
+
+def process():
+    """ Runs the suite, or one comparison, as given on the command line """
+    parser = ArgumentParser(description="Benchmark the Mandelbrot kernels")
+    parser.add_argument('--resolutions', '-r', type=int, nargs='+',
+                        default=[100, 300])
+    parser.add_argument('--limits', '-l', type=int, nargs='+', default=[50, 200])
+    parser.add_argument('--kernels', '-k', nargs='+',
+                        help="Names of the kernels to run, default all")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', '-o',
+                        help="Save results to this .csv or .json file")
+    parser.add_argument('--compare', choices=["active", "progressive", "inplace"],
+                        help="Run one of the focused comparisons instead")
+    arguments = parser.parse_args()
+
+    if arguments.compare:
+        print_comparison(arguments.compare)
+        return
+
+    kernels = all_kernels()
+    if arguments.kernels:
+        kernels = {name: kernels[name] for name in arguments.kernels}
+    results = run_suite(kernels, arguments.resolutions, arguments.limits,
+                        arguments.repeats)
+    print_results(results)
+    if arguments.output:
+        save_results(results, arguments.output)
+
+
+if __name__ == "__main__":
+    process()
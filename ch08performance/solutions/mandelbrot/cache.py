@@ -0,0 +1,162 @@
+""" Persistent, content-addressed cache of rendered Mandelbrot tiles
+
+    The pixels of a window lie on a lattice of points ``(n + phase) * step``
+    for integers n, where the phase is where the window's corner falls between
+    multiples of the pixel size. The lattice is cut into square tiles. A tile
+    is identified by the hash of everything its escape counts depend on:
+    kernel, limit, pixel size, phase and position on the lattice. So any two
+    windows at the same zoom, panned by whole pixels, share the tiles where
+    they overlap, whether they are rendered in the same session or not.
+
+    Tiles are saved as compressed numpy files. When the cache grows beyond its
+    size limit, the least recently used tiles are deleted.
+"""
+import math
+import os
+from collections import OrderedDict
+from hashlib import sha256
+from tempfile import NamedTemporaryFile
+
+import numpy as np
+
+from mandelbrot import grid_shape, mandel5
+
+
+def pixel_size(low, high, resolution):
+    """ Distance between pixels, rounded so nearby windows agree exactly
+
+        ``(high - low) / resolution`` may differ in the last bits between two
+        windows of the same width, which would stop them sharing tiles.
+    """
+    return float(f"{(high - low) / resolution:.12g}")
+
+
+def lattice_phase(low, step):
+    """ First lattice index, and phase, of a window starting at low
+
+        The phase is the fraction of a step between the lattice's multiples
+        of step and low, so that ``(index + phase) * step`` is low. It is
+        rounded so windows panned by whole pixels agree exactly.
+    """
+    index = math.floor(low / step)
+    phase = round(low / step - index, 9)
+    if phase == 1:
+        index, phase = index + 1, 0.0
+    return index, phase
+
+
+def lattice_positions(rows, columns, xstep, ystep, xphase=0, yphase=0):
+    """ Complex positions of the given lattice rows and columns """
+    xs = (np.asarray(columns, dtype=float) + xphase) * xstep
+    ys = (np.asarray(rows, dtype=float) + yphase) * ystep
+    return xs[np.newaxis, :] + 1j * ys[:, np.newaxis]
+
+
+class TileCache(object):
+    """ Renders windows of the Mandelbrot set from tiles cached on disk """
+
+    def __init__(self, directory, max_bytes=2**30, tile_size=128):
+        self.directory = directory
+        """ Directory holding the cached tiles """
+        self.max_bytes = max_bytes
+        """ Total size of the tiles above which old tiles are evicted """
+        self.tile_size = tile_size
+        """ Number of rows and columns of each tile """
+
+        os.makedirs(directory, exist_ok=True)
+        tiles = [entry for entry in os.scandir(directory)
+                 if entry.name.endswith(".npz")]
+        tiles.sort(key=lambda entry: entry.stat().st_mtime)
+        self._sizes = OrderedDict(
+            (entry.path, entry.stat().st_size) for entry in tiles)
+        """ Size of each tile file, least recently used first """
+        self._nbytes = sum(self._sizes.values())
+        """ Running total of the sizes, kept up to date as tiles come and go """
+
+    @property
+    def nbytes(self):
+        """ Total size of the cached tiles """
+        return self._nbytes
+
+    def render(self, xmin, xmax, ymin, ymax, resolution, limit=50,
+               kernel=mandel5):
+        """ Escape counts over a window, reusing cached tiles
+
+            The same as kernel on the lessons' grid, up to rounding: the
+            pixels are at the lattice points of the window, see
+            `lattice_phase`, which differ from the grid's in the last bits.
+        """
+        xstep = pixel_size(xmin, xmax, resolution)
+        ystep = pixel_size(ymin, ymax, resolution)
+        nrows, ncolumns = grid_shape(xmin, xmax, ymin, ymax, resolution)
+        first_row, yphase = lattice_phase(ymin, ystep)
+        first_column, xphase = lattice_phase(xmin, xstep)
+
+        size = self.tile_size
+        image = None
+        for tile_row in range(first_row // size,
+                              (first_row + nrows - 1) // size + 1):
+            for tile_column in range(first_column // size,
+                                     (first_column + ncolumns - 1) // size + 1):
+                tile = self.tile(tile_row, tile_column, xstep, ystep, limit,
+                                 kernel, xphase, yphase)
+                if image is None:
+                    image = np.empty((nrows, ncolumns), dtype=tile.dtype)
+                # Overlap of the tile and the window, in lattice coordinates
+                top = max(tile_row * size, first_row)
+                bottom = min((tile_row + 1) * size, first_row + nrows)
+                left = max(tile_column * size, first_column)
+                right = min((tile_column + 1) * size, first_column + ncolumns)
+                image[top - first_row:bottom - first_row,
+                      left - first_column:right - first_column] = tile[
+                    top - tile_row * size:bottom - tile_row * size,
+                    left - tile_column * size:right - tile_column * size]
+        return image
+
+    def tile(self, tile_row, tile_column, xstep, ystep, limit=50,
+             kernel=mandel5, xphase=0, yphase=0):
+        """ Escape counts over one tile, from the cache or freshly computed """
+        key = repr((kernel.__module__, kernel.__qualname__, limit, xstep,
+                    ystep, xphase, yphase, self.tile_size, tile_row,
+                    tile_column))
+        path = os.path.join(self.directory,
+                            sha256(key.encode()).hexdigest() + ".npz")
+
+        if path in self._sizes:
+            try:
+                with np.load(path) as stored:
+                    counts = stored["counts"]
+            except FileNotFoundError:
+                # Deleted behind our back, e.g. by another process
+                self._nbytes -= self._sizes.pop(path)
+            else:
+                os.utime(path)
+                self._sizes.move_to_end(path)
+                return counts
+
+        size = self.tile_size
+        rows = np.arange(tile_row * size, (tile_row + 1) * size)
+        columns = np.arange(tile_column * size, (tile_column + 1) * size)
+        counts = kernel(lattice_positions(rows, columns, xstep, ystep, xphase,
+                                          yphase), limit)
+        self._store(path, counts)
+        return counts
+
+    def _store(self, path, counts):
+        """ Saves a tile atomically, then evicts old tiles if needed """
+        with NamedTemporaryFile(dir=self.directory, suffix=".tmp",
+                                delete=False) as output:
+            np.savez_compressed(output, counts=counts)
+        os.replace(output.name, path)
+        size = os.path.getsize(path)
+        self._nbytes += size - self._sizes.get(path, 0)
+        self._sizes[path] = size
+        self._sizes.move_to_end(path)
+
+        while self._nbytes > self.max_bytes and len(self._sizes) > 1:
+            oldest, size = self._sizes.popitem(last=False)
+            self._nbytes -= size
+            try:
+                os.remove(oldest)
+            except FileNotFoundError:
+                pass
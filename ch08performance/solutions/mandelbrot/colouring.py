@@ -0,0 +1,93 @@
+""" Smooth, histogram-equalised colouring of the Mandelbrot set
+
+    Integer escape counts give visible bands of colour. The normalised
+    iteration count, ``n + 1 - log2(log|z| / log 2)`` where ``z`` is the first
+    value outside the circle of radius 2, reached at iteration ``n``, varies
+    continuously instead. Histogram equalisation then spreads colours evenly
+    over the pixels, whatever the limit.
+
+    mandel_smooth computes the counts, the continuous values and the
+    histogram in the same sweep as mandel5, so colouring is a single array
+    lookup afterwards.
+"""
+import numpy as np
+
+SMOOTH_FLOOR = 1e-6
+""" Least normalised count of an escaping pixel
+
+    Far outside the set, ``|z|`` is so large on the first iterations that the
+    normalised count drops to 0 or below, and would be mistaken for the
+    interior. Those counts are raised to this floor.
+"""
+
+
+def mandel_smooth(position, limit=50):
+    """ mandel5's escape counts, with continuous counts and their histogram
+
+        :returns: A tuple of four arrays:
+
+            - mandel5's escape counts,
+            - the normalised iteration count of each pixel, at least
+              SMOOTH_FLOOR for pixels which escaped, and 0 for the others,
+            - the histogram of escape iterations: entry n, for n from 1 to
+              limit, counts the pixels which escaped at iteration n, and entry
+              0 the pixels which never escaped,
+            - whether each pixel escaped.
+    """
+    value = position
+    diverged_at_count = np.zeros(position.shape)
+    smooth = np.zeros(position.shape)
+    histogram = np.zeros(limit + 1, dtype=int)
+    escaped = np.zeros(position.shape, dtype=bool)
+    iteration = 0
+    while limit > 0:
+        limit -= 1
+        iteration += 1
+        value = value**2 + position
+        size = (value * np.conj(value)).real
+        diverging = size > 4
+        first_diverged_this_time = np.logical_and(diverging,
+                                                  np.logical_not(escaped))
+        diverged_at_count[first_diverged_this_time] = limit
+        escaped[first_diverged_this_time] = True
+        # log|z| / log 2 is log|z|^2 / log 4
+        smooth[first_diverged_this_time] = np.maximum(iteration + 1 - np.log2(
+            np.log(size[first_diverged_this_time]) / np.log(4)), SMOOTH_FLOOR)
+        histogram[iteration] = np.count_nonzero(first_diverged_this_time)
+        value[diverging] = 2
+
+    histogram[0] = position.size - histogram.sum()
+    return diverged_at_count, smooth, histogram, escaped
+
+
+def equalise(smooth, histogram, escaped=None):
+    """ Histogram-equalised colour, between 0 and 1, of each pixel
+
+        The colour of a pixel is the fraction of escaping pixels which escaped
+        no later than it did, interpolated between iterations using the
+        continuous count. Pixels which never escaped get 0, and the others
+        more than 0.
+
+        :Parameters:
+          smooth: array
+            Normalised iteration counts, from mandel_smooth.
+          histogram: array
+            Histogram of escape iterations, from mandel_smooth.
+          escaped: array of booleans
+            Whether each pixel escaped, from mandel_smooth. Defaults to the
+            pixels with a positive count.
+    """
+    if escaped is None:
+        escaped = smooth > 0
+    limit = len(histogram) - 1
+    if limit == 0:
+        # No iterations, so nothing escaped
+        return np.zeros(np.shape(smooth))
+    # fraction[n] is the fraction of escaping pixels that escaped by iteration n
+    fraction = np.cumsum(histogram) - histogram[0]
+    fraction = fraction / max(fraction[-1], 1)
+    whole = np.clip(np.floor(smooth).astype(int), 0, limit - 1)
+    part = np.clip(smooth - whole, 0, 1)
+    colour = fraction[whole] + part * (fraction[whole + 1] - fraction[whole])
+    colour[np.logical_not(escaped)] = 0
+    return colour
@@ -0,0 +1,118 @@
+""" Deep zooms into the Mandelbrot set, by perturbation
+
+    Once the window is narrower than about 1e-13, neighbouring pixels are no
+    longer distinct float64 numbers, and mandel5 draws blocks. Instead, we
+    iterate a single reference point, the centre of the window, in arbitrary
+    precision with the decimal module. Every pixel is then iterated as a small
+    float64 offset ``d`` from that reference orbit ``Z``: if ``z = Z + d``
+    and ``c = C + dc``, then
+
+        d_{n+1} = 2 Z_n d_n + d_n^2 + dc
+
+    and the offsets stay representable in float64 however deep the zoom. This
+    last step is vectorised over all pixels with numpy, like mandel_active.
+
+    When a pixel's orbit gets closer to zero than to the reference orbit, or
+    the reference orbit escapes, the offset is no longer accurate: we then
+    rebase the pixel onto the start of the reference orbit, with ``d = Z + d``.
+"""
+from decimal import Decimal, localcontext
+
+import numpy as np
+
+
+def reference_orbit(center_x, center_y, limit, digits=50):
+    """ Orbit of the centre, computed in arbitrary precision
+
+        :Parameters:
+          center_x, center_y: strings or Decimals
+            Coordinates of the reference point, to as many digits as needed.
+          digits: integer
+            Number of significant digits to iterate with.
+        :returns: complex128 array ``Z`` with ``Z[0] = 0``, ``Z[n+1] = Z[n]**2 + C``,
+            up to the first value outside of the circle of radius 2, or
+            ``limit + 2`` values.
+    """
+    with localcontext() as context:
+        context.prec = digits
+        cx, cy = Decimal(center_x), Decimal(center_y)
+        x, y = Decimal(0), Decimal(0)
+        orbit = [0j]
+        for _ in range(limit + 1):
+            x, y = x * x - y * y + cx, 2 * x * y + cy
+            orbit.append(complex(float(x), float(y)))
+            if x * x + y * y > 4:
+                break
+    return np.array(orbit)
+
+
+def mandel_perturbation(orbit, offsets, limit=50):
+    """ Escape counts, as mandel5 would give, of the points ``C + offsets``
+
+        :Parameters:
+          orbit: array
+            Reference orbit of C, from reference_orbit.
+          offsets: array
+            Complex offsets ``dc`` of each pixel from the reference point.
+    """
+    diverged_at_count = np.zeros(offsets.shape)
+    counts = diverged_at_count.reshape(-1)
+    indices = np.arange(offsets.size)
+    dc = offsets.reshape(-1)
+    # mandel5 starts from z_1 = c, so do one step before counting
+    delta = dc.copy()
+    reference = np.ones(dc.shape, dtype=int)
+    last = len(orbit) - 1
+    while limit > 0 and indices.size > 0:
+        limit -= 1
+        # The reference orbit stops once it escapes, maybe at its first value
+        ended = reference == last
+        delta[ended] += orbit[last]
+        reference[ended] = 0
+
+        delta = 2 * orbit[reference] * delta + delta * delta + dc
+        reference += 1
+        value = orbit[reference] + delta
+        size = value.real**2 + value.imag**2
+        diverging = size > 4
+        if diverging.any():
+            counts[indices[diverging]] = limit
+            bounded = np.logical_not(diverging)
+            indices = indices[bounded]
+            delta, dc = delta[bounded], dc[bounded]
+            reference, value, size = reference[bounded], value[bounded], size[bounded]
+
+        rebase = size < delta.real**2 + delta.imag**2
+        delta[rebase] = value[rebase]
+        reference[rebase] = 0
+
+    return diverged_at_count
+
+
+def render_deep(center_x, center_y, width, resolution, limit=1000,
+                height=None, digits=None):
+    """ Escape counts over a window of any width around a precise centre
+
+        :Parameters:
+          center_x, center_y: strings or Decimals
+            Centre of the window, to as many digits as the zoom needs.
+          width: float
+            Width of the window, e.g. 1e-30.
+          height: float
+            Height of the window. Defaults to width.
+          digits: integer
+            Precision of the reference orbit. Defaults to enough digits to
+            resolve a pixel, plus some.
+        :returns: An image laid out like mandel5's, with rows going up in y
+            and columns going up in x.
+    """
+    height = width if height is None else height
+    if digits is None:
+        digits = max(30, int(-np.log10(width / resolution)) + 20)
+    step_x = width / resolution
+    step_y = height / resolution
+    dx = np.arange(resolution) * step_x - width / 2
+    dy = np.arange(resolution) * step_y - height / 2
+    offsets = dx[np.newaxis, :] + 1j * dy[:, np.newaxis]
+    orbit = reference_orbit(center_x, center_y, limit, digits)
+    return mandel_perturbation(orbit, offsets, limit)
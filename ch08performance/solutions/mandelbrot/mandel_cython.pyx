@@ -0,0 +1,25 @@
+""" The Cython Mandelbrot kernels from the Cython lesson
+
+    Compiled on import by pyximport, see benchmarks.py.
+"""
+
+
+def mandel_cython(position, limit=50):
+    value = position
+    while abs(value) < 2:
+        limit -= 1
+        value = value**2 + position
+        if limit < 0:
+            return 0
+    return limit
+
+
+cpdef call_typed_mandel_cython(double complex position, int limit=50):
+    cdef double complex value
+    value = position
+    while abs(value) < 2:
+        limit -= 1
+        value = value**2 + position
+        if limit < 0:
+            return 0
+    return limit
@@ -0,0 +1,192 @@
+""" Mandelbrot kernels from the performance programming lessons
+
+    The kernels below are the ones developed in the notebooks of this chapter,
+    collected in one module so they can be imported, tested and timed outside
+    of a notebook, together with faster variants of them.
+"""
+import math
+
+import numpy as np
+
+
+def mandel1(position, limit=50):
+    """ Escape count of a single complex number, in pure python """
+    value = position
+    while abs(value) < 2:
+        limit -= 1
+        value = value**2 + position
+        if limit < 0:
+            return 0
+    return limit
+
+
+def mandel1_fast(position, limit=50):
+    """ Same escape count as mandel1, returning early for interior points
+
+        Points inside the main cardioid or the period-2 bulb never escape, and
+        we can tell analytically. Otherwise, we look for the orbit coming back
+        exactly onto a value it had before, with Brent's cycle detection: a
+        periodic orbit never escapes either. Both cases return 0, just as
+        mandel1 does once it runs out of iterations.
+    """
+    x, y = position.real, position.imag
+    q = (x - 0.25)**2 + y**2
+    if q * (q + (x - 0.25)) < 0.25 * y**2:
+        return 0
+    if (x + 1)**2 + y**2 < 0.0625:
+        return 0
+
+    value = position
+    saved = value
+    period = 0
+    power = 1
+    while abs(value) < 2:
+        limit -= 1
+        value = value**2 + position
+        if limit < 0:
+            return 0
+        if value == saved:
+            return 0
+        period += 1
+        if period == power:
+            # Compare against a newer value, over a window twice as long
+            saved = value
+            period = 0
+            power *= 2
+    return limit
+
+
+def mandel4(position, limit=50):
+    """ Escape counts of an array of complex numbers, with numpy """
+    value = position
+    diverged_at_count = np.zeros(position.shape)
+    while limit > 0:
+        limit -= 1
+        value = value**2 + position
+        diverging = abs(value) > 2
+        first_diverged_this_time = np.logical_and(diverging,
+                                                  diverged_at_count == 0)
+        diverged_at_count[first_diverged_this_time] = limit
+        value[diverging] = 2
+
+    return diverged_at_count
+
+
+def mandel5(position, limit=50):
+    """ Same as mandel4, but avoids the square root in abs """
+    value = position
+    diverged_at_count = np.zeros(position.shape)
+    while limit > 0:
+        limit -= 1
+        value = value**2 + position
+        diverging = value * np.conj(value) > 4
+        first_diverged_this_time = np.logical_and(diverging, diverged_at_count == 0)
+        diverged_at_count[first_diverged_this_time] = limit
+        value[diverging] = 2
+
+    return diverged_at_count
+
+
+def mandel_active(position, limit=50):
+    """ Same escape counts as mandel5, iterating only still-bounded points
+
+        Rather than clamping escaped points and carrying on squaring them, as
+        mandel5 does, we keep a compacted array of the indices of the points
+        which have not escaped yet, and only iterate those. The cost of an
+        iteration then goes down with the number of points left, so mostly
+        exterior images are much cheaper at high limits.
+    """
+    diverged_at_count = np.zeros(position.shape)
+    counts = diverged_at_count.reshape(-1)
+    indices = np.arange(position.size)
+    position = position.reshape(-1)
+    value = position
+    while limit > 0 and indices.size > 0:
+        limit -= 1
+        value = value**2 + position
+        diverging = value * np.conj(value) > 4
+        if diverging.any():
+            counts[indices[diverging]] = limit
+            # Boolean indexing copies, so only compact when something escaped
+            bounded = np.logical_not(diverging)
+            indices = indices[bounded]
+            value = value[bounded]
+            position = position[bounded]
+
+    return diverged_at_count
+
+
+# The introduction's mandel_numpy is the very same algorithm as mandel5
+mandel_numpy = mandel5
+
+
+def mandel_inplace(position, limit=50, dtype=np.complex128):
+    """ Same escape counts as mandel_numpy, without allocating in the loop
+
+        Every step of mandel_numpy creates several new arrays. Here, each
+        ufunc writes into buffers allocated once, before the loop, with
+        ``out=``, and masked assignments become ``np.copyto(..., where=)``.
+
+        :Parameters:
+          dtype: numpy complex type
+            Precision of the iteration. ``np.complex64`` halves the memory
+            traffic, at the cost of some escape counts near the boundary.
+    """
+    position = np.asarray(position, dtype=dtype)
+    value = position.copy()
+    diverged_at_count = np.zeros(position.shape)
+    size = np.empty(position.shape, dtype=value.real.dtype)
+    imaginary_squared = np.empty_like(size)
+    diverging = np.empty(position.shape, dtype=bool)
+    first_diverged_this_time = np.empty_like(diverging)
+    while limit > 0:
+        limit -= 1
+        np.multiply(value, value, out=value)
+        np.add(value, position, out=value)
+        # |value|^2, as the real part of value * conj(value)
+        np.multiply(value.real, value.real, out=size)
+        np.multiply(value.imag, value.imag, out=imaginary_squared)
+        np.add(size, imaginary_squared, out=size)
+        np.greater(size, 4, out=diverging)
+        np.equal(diverged_at_count, 0, out=first_diverged_this_time)
+        np.logical_and(diverging, first_diverged_this_time,
+                       out=first_diverged_this_time)
+        np.copyto(diverged_at_count, limit, where=first_diverged_this_time)
+        np.copyto(value, 2, where=diverging)
+
+    return diverged_at_count
+
+
+def grid_shape(xmin, xmax, ymin, ymax, resolution):
+    """ Shape of the grid ``np.mgrid[ymin:ymax:ystep, xmin:xmax:xstep]``
+
+        Because the steps are floating point, numpy may give one more point
+        along an axis than ``resolution``.
+    """
+    xstep = (xmax - xmin) / resolution
+    ystep = (ymax - ymin) / resolution
+    return math.ceil((ymax - ymin) / ystep), math.ceil((xmax - xmin) / xstep)
+
+
+def positions(xmin, xmax, ymin, ymax, resolution, rows=None, columns=None):
+    """ Complex positions of the grid used throughout the lessons
+
+        Equal, bit for bit, to ``xmatrix + 1j * ymatrix`` with
+        ``ymatrix, xmatrix = np.mgrid[ymin:ymax:ystep, xmin:xmax:xstep]``,
+        but only the given slices of rows and columns are ever computed.
+
+        :Parameters:
+          rows: slice
+            Rows of the grid to compute. Defaults to all of them.
+          columns: slice
+            Columns of the grid to compute. Defaults to all of them.
+    """
+    xstep = (xmax - xmin) / resolution
+    ystep = (ymax - ymin) / resolution
+    nrows, ncolumns = grid_shape(xmin, xmax, ymin, ymax, resolution)
+    rows = range(nrows)[rows or slice(None)]
+    columns = range(ncolumns)[columns or slice(None)]
+    # Same arithmetic as mgrid: float index times step, plus start
+    ys = np.arange(rows.start, rows.stop, rows.step, dtype=float) * ystep + ymin
+    xs = np.arange(columns.start, columns.stop, columns.step, dtype=float) * xstep + xmin
+    return xs[np.newaxis, :] + 1j * ys[:, np.newaxis]
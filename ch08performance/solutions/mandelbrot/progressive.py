@@ -0,0 +1,134 @@
+""" Renders the Mandelbrot set coarse first, refining only near boundaries
+
+    This is Mariani and Silver's rectangle subdivision. We compute the escape
+    counts along the lines of a coarse grid, with the array-wise kernel. Any
+    cell of that grid whose border has one and the same count all round is
+    left alone, on the assumption that nothing different hides inside it.
+    Other cells are cut in four, and we carry on until cells are so small they
+    have no inside left. Finally, the inside of every cell left alone is filled
+    with the count of its border.
+
+    The assumption holds for the set itself, which is connected, but not
+    for the pixels we sample it with: filaments thinner than a pixel can cross
+    a cell between the pixels of its border. The image is then not exactly the
+    kernel's, with a few pixels wrong along such filaments.
+
+    All the cells of a level are handled at once with array operations, and
+    all the pixels they need are computed with a single call to the kernel.
+"""
+import numpy as np
+
+from mandelbrot import grid_shape, mandel5
+
+
+def _ranges(starts, stops):
+    """ Concatenation of ``arange(start, stop)`` for each start and stop """
+    lengths = stops - starts
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.arange(lengths.sum()) - offsets + np.repeat(starts, lengths)
+
+
+def _lines(stop, step):
+    """ Grid lines from 0 to stop inclusive, step apart """
+    return np.append(np.arange(0, stop, step), stop)
+
+
+def _runs(same):
+    """ Cumulative count of equal neighbours, with a leading zero
+
+        The pixels from i to j along the last axis are all equal if
+        ``runs[..., j] - runs[..., i] == j - i``.
+    """
+    runs = np.zeros(same.shape[:-1] + (same.shape[-1] + 1,), dtype=int)
+    np.cumsum(same, axis=-1, out=runs[..., 1:])
+    return runs
+
+
+def render_progressive(xmin, xmax, ymin, ymax, resolution, limit=50,
+                       kernel=mandel5, coarse=8):
+    """ Escape counts as kernel would give, iterating only near boundaries
+
+        Features thinner than a pixel, such as the Mandelbrot set's finest
+        filaments, can slip between the pixels of a cell's border. Then
+        a few pixels inside differ from what the kernel would give, so check
+        against the full-resolution kernel when zooming into such regions.
+
+        :Parameters:
+          kernel: callable
+            Array-wise kernel, e.g. mandel5.
+          coarse: integer
+            Spacing, in pixels, of the lines of the initial coarse grid.
+        :returns: The image, and the fraction of its pixels that were
+            actually iterated.
+    """
+    nrows, ncolumns = grid_shape(xmin, xmax, ymin, ymax, resolution)
+    # Same arithmetic as mgrid, see mandelbrot.positions
+    ys = np.arange(nrows, dtype=float) * ((ymax - ymin) / resolution) + ymin
+    xs = np.arange(ncolumns, dtype=float) * ((xmax - xmin) / resolution) + xmin
+
+    image = None
+    known = np.zeros((nrows, ncolumns), dtype=bool)
+
+    def compute(rows, columns):
+        """ Runs the kernel over those of the given pixels not yet known """
+        nonlocal image
+        pixels = np.unique(np.ravel_multi_index((rows, columns), known.shape))
+        rows, columns = np.unravel_index(pixels[~known.flat[pixels]],
+                                         known.shape)
+        counts = kernel(xs[columns] + 1j * ys[rows], limit)
+        if image is None:
+            image = np.zeros(known.shape, dtype=counts.dtype)
+        image[rows, columns] = counts
+        known[rows, columns] = True
+
+    row_lines = _lines(nrows - 1, coarse)
+    column_lines = _lines(ncolumns - 1, coarse)
+    rows, columns = np.meshgrid(row_lines, np.arange(ncolumns), indexing="ij")
+    compute(rows.ravel(), columns.ravel())
+    rows, columns = np.meshgrid(np.arange(nrows), column_lines, indexing="ij")
+    compute(rows.ravel(), columns.ravel())
+
+    # Cells are given by their first and last rows and columns, borders included
+    top, left = (array.ravel() for array in np.meshgrid(
+        row_lines[:-1], column_lines[:-1], indexing="ij"))
+    bottom, right = (array.ravel() for array in np.meshgrid(
+        row_lines[1:], column_lines[1:], indexing="ij"))
+    while top.size > 0:
+        inside = np.logical_and(bottom - top >= 2, right - left >= 2)
+        top, bottom, left, right = (top[inside], bottom[inside],
+                                    left[inside], right[inside])
+
+        across = _runs(image[:, 1:] == image[:, :-1])
+        down = _runs(image[1:].T == image[:-1].T)
+        uniform = np.all([
+            across[top, right] - across[top, left] == right - left,
+            across[bottom, right] - across[bottom, left] == right - left,
+            down[left, bottom] - down[left, top] == bottom - top,
+            down[right, bottom] - down[right, top] == bottom - top,
+        ], axis=0)
+        split = np.logical_not(uniform)
+        top, bottom, left, right = (top[split], bottom[split],
+                                    left[split], right[split])
+        if top.size == 0:
+            break
+
+        middle_row = (top + bottom) // 2
+        middle_column = (left + right) // 2
+        compute(
+            np.concatenate([np.repeat(middle_row, right - left + 1),
+                            _ranges(top, bottom + 1)]),
+            np.concatenate([_ranges(left, right + 1),
+                            np.repeat(middle_column, bottom - top + 1)]))
+        top, bottom, left, right = (
+            np.concatenate([top, top, middle_row, middle_row]),
+            np.concatenate([middle_row, middle_row, bottom, bottom]),
+            np.concatenate([left, middle_column, left, middle_column]),
+            np.concatenate([middle_column, right, middle_column, right]))
+
+    iterated = np.count_nonzero(known)
+    # Every pixel not yet known is inside a uniform cell, and the nearest
+    # known pixel to its left is on the border of that cell
+    nearest_known = np.where(known, np.arange(ncolumns), 0)
+    np.maximum.accumulate(nearest_known, axis=1, out=nearest_known)
+    image = np.take_along_axis(image, nearest_known, axis=1)
+    return image, iterated / image.size
@@ -0,0 +1,79 @@
+""" Computes the Mandelbrot set band by band, straight to disk
+
+    The positions grid, the escape counts and the kernel's temporaries all
+    scale with the size of the image. Computing one horizontal band of rows at
+    a time, and writing each band to a memory-mapped file as soon as it is
+    done, bounds memory by the size of a band instead.
+"""
+from mandelbrot import grid_shape, mandel5, positions
+
+
+def mandel_bands(xmin, xmax, ymin, ymax, resolution, limit=50, kernel=mandel5,
+                 band_rows=64):
+    """ Yields (rows, counts) for successive horizontal bands of the image
+
+        :Parameters:
+          band_rows: integer
+            Number of rows in each band. Peak memory is proportional to
+            ``band_rows`` times the number of columns.
+        :returns: A generator of a slice of rows of the full image, and the
+            escape counts for those rows.
+    """
+    nrows, _ = grid_shape(xmin, xmax, ymin, ymax, resolution)
+    for start in range(0, nrows, band_rows):
+        rows = slice(start, min(start + band_rows, nrows))
+        yield rows, kernel(positions(xmin, xmax, ymin, ymax, resolution,
+                                     rows=rows), limit)
+
+
+def write_bands(filename, shape, bands, dataset="counts"):
+    """ Writes bands to a memory-mapped ``.npy`` file or an HDF5 file
+
+        The file is created when the first band arrives, since only then do we
+        know the type of the counts.
+
+        :Parameters:
+          filename: string
+            Path to the output. Files ending in ``.h5`` or ``.hdf5`` are
+            written with h5py, anything else as ``.npy``.
+          shape: tuple
+            Shape of the full image.
+          bands: iterable
+            (rows, counts) pairs, as yielded by mandel_bands.
+          dataset: string
+            Name of the dataset, for HDF5 files.
+    """
+    if filename.endswith((".h5", ".hdf5")):
+        from h5py import File
+        with File(filename, "w") as output:
+            image = None
+            for rows, counts in bands:
+                if image is None:
+                    image = output.create_dataset(
+                        dataset, shape, dtype=counts.dtype,
+                        chunks=(counts.shape[0], shape[1]))
+                image[rows] = counts
+        return
+
+    from numpy.lib.format import open_memmap
+    image = None
+    for rows, counts in bands:
+        if image is None:
+            image = open_memmap(filename, mode="w+", dtype=counts.dtype,
+                                shape=shape)
+        image[rows] = counts
+        image.flush()
+    del image
+
+
+def render_to_file(filename, xmin, xmax, ymin, ymax, resolution, limit=50,
+                   kernel=mandel5, band_rows=64):
+    """ Computes the image band by band, and streams it to filename
+
+        Load the result lazily with ``numpy.load(filename, mmap_mode='r')``,
+        or with h5py for HDF5 files.
+    """
+    shape = grid_shape(xmin, xmax, ymin, ymax, resolution)
+    bands = mandel_bands(xmin, xmax, ymin, ymax, resolution, limit, kernel,
+                         band_rows)
+    write_bands(filename, shape, bands)
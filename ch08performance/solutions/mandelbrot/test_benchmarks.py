@@ -0,0 +1,44 @@
+""" Tests the benchmark suite itself, on a tiny grid """
+from benchmarks import all_kernels, run_suite, save_results
+
+
+def test_every_kernel_is_correct():
+    """ Check every kernel gives the reference counts """
+    results = run_suite(resolutions=[40], limits=[50], repeats=1)
+    assert {row["kernel"] for row in results} == set(all_kernels())
+    for row in results:
+        assert row["correct"], row["kernel"]
+        assert row["seconds"] > 0
+        assert row["pixels_per_second"] > 0
+
+
+def test_results_saved(tmp_path):
+    """ Check the table is saved in a machine-readable form """
+    import csv
+    import json
+    from mandelbrot import mandel5
+    results = run_suite({"mandel5": mandel5}, resolutions=[10, 20],
+                        limits=[5], repeats=1)
+
+    save_results(results, str(tmp_path / "results.json"))
+    assert json.load(open(str(tmp_path / "results.json"))) == results
+
+    save_results(results, str(tmp_path / "results.csv"))
+    rows = list(csv.DictReader(open(str(tmp_path / "results.csv"))))
+    assert [row["resolution"] for row in rows] == ["10", "20"]
+
+
+def test_cython_build_failure_skips_kernels(monkeypatch):
+    """ Check Cython kernels which fail to build are skipped with a warning """
+    import sys
+    from types import ModuleType
+    from pytest import warns
+    from benchmarks import cython_kernels
+
+    def install(**kwargs):
+        raise RuntimeError("no C compiler")
+    pyximport = ModuleType("pyximport")
+    pyximport.install = install
+    monkeypatch.setitem(sys.modules, "pyximport", pyximport)
+    with warns(UserWarning, match="no C compiler"):
+        assert cython_kernels() == {}
@@ -0,0 +1,90 @@
+""" Tests the on-disk tile cache """
+import os
+from unittest.mock import Mock
+from numpy.testing import assert_array_equal
+from mandelbrot import mandel5, grid_shape, positions
+from cache import TileCache, lattice_phase, lattice_positions, pixel_size
+
+
+def expected_window(xmin, xmax, ymin, ymax, resolution, limit=50):
+    """ mandel5 computed directly on the window's lattice points """
+    from numpy import arange
+    xstep = pixel_size(xmin, xmax, resolution)
+    ystep = pixel_size(ymin, ymax, resolution)
+    nrows, ncolumns = grid_shape(xmin, xmax, ymin, ymax, resolution)
+    first_row, yphase = lattice_phase(ymin, ystep)
+    first_column, xphase = lattice_phase(xmin, xstep)
+    rows = arange(nrows) + first_row
+    columns = arange(ncolumns) + first_column
+    return mandel5(lattice_positions(rows, columns, xstep, ystep, xphase,
+                                     yphase), limit)
+
+
+def counting_kernel():
+    """ mandel5, wrapped to count the pixels it computes """
+    kernel = Mock(side_effect=mandel5)
+    kernel.__module__, kernel.__qualname__ = "test", "counting"
+    return kernel
+
+
+def test_render_matches_kernel(tmp_path):
+    """ Check windows are rendered as if on the lattice directly """
+    cache = TileCache(str(tmp_path), tile_size=16)
+    for window in [(-1.5, 0.5, -1.0, 1.0, 60), (-0.7, 0.1, 0.2, 1.0, 45)]:
+        assert_array_equal(cache.render(*window, limit=30),
+                           expected_window(*window, limit=30))
+        # And the same again, from the cache
+        assert_array_equal(cache.render(*window, limit=30),
+                           expected_window(*window, limit=30))
+
+
+def test_unaligned_window_matches_lessons_grid(tmp_path):
+    """ Check a window off the lattice of multiples of the pixel size is not moved """
+    from numpy import count_nonzero
+    window = (-0.7, 0.1, 0.2, 1.0, 45)
+    cache = TileCache(str(tmp_path), tile_size=16)
+    assert_array_equal(cache.render(*window, limit=30),
+                       mandel5(positions(*window), 30))
+    # Positions differ from the grid's in the last bits, which can change
+    # the count of a few pixels close to the set at high limits
+    window = (-1.5, 0.5, -1.0, 1.0, 300)
+    image = cache.render(*window, limit=200)
+    assert count_nonzero(image != mandel5(positions(*window), 200)) <= 1e-3 * image.size
+
+
+def test_overlapping_windows_reuse_tiles(tmp_path):
+    """ Check panning at the same zoom only computes the new tiles """
+    # The kernel is called once per tile computed
+    kernel = counting_kernel()
+    cache = TileCache(str(tmp_path), tile_size=16)
+    cache.render(-1.5, 0.5, -1.0, 1.0, 64, kernel=kernel)
+    computed = kernel.call_count
+    cache.render(-1.5, 0.5, -1.0, 1.0, 64, kernel=kernel)
+    assert kernel.call_count == computed
+
+    # Shift right by half the window: half of the tiles are new
+    cache.render(-0.5, 1.5, -1.0, 1.0, 64, kernel=kernel)
+    assert 0 < kernel.call_count - computed <= computed // 2 + 5
+
+    # A new cache object over the same directory finds the tiles on disk
+    assert_array_equal(
+        TileCache(str(tmp_path), tile_size=16).render(-1.5, 0.5, -1.0, 1.0, 64,
+                                                      kernel=kernel),
+        expected_window(-1.5, 0.5, -1.0, 1.0, 64))
+    assert kernel.call_count - computed <= computed // 2 + 5
+
+
+def test_least_recently_used_evicted(tmp_path):
+    """ Check the cache stays within budget, dropping the oldest tiles """
+    cache = TileCache(str(tmp_path), tile_size=16)
+    cache.render(-1.5, 0.5, -1.0, 1.0, 32)
+    one_window = cache.nbytes
+    cache.max_bytes = one_window + 1
+    first = set(os.listdir(str(tmp_path)))
+
+    cache.render(10.0, 12.0, 10.0, 12.0, 32)
+    assert cache.nbytes <= cache.max_bytes
+    remaining = set(os.listdir(str(tmp_path)))
+    assert not first <= remaining
+    assert sum(os.path.getsize(str(tmp_path / name))
+               for name in remaining) == cache.nbytes
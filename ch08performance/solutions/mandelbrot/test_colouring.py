@@ -0,0 +1,73 @@
+""" Tests the single sweep smooth colouring """
+import numpy as np
+from numpy.testing import assert_array_equal
+from mandelbrot import mandel5, positions
+from colouring import equalise, mandel_smooth
+
+
+def test_counts_and_histogram():
+    """ Check counts are mandel5's, and the histogram adds up """
+    values = positions(-2.0, 1.0, -1.5, 1.5, 120)
+    counts, smooth, histogram, escaped = mandel_smooth(values, 60)
+    assert_array_equal(counts, mandel5(values, 60))
+    assert histogram.sum() == values.size
+    assert histogram[0] == np.count_nonzero(np.logical_not(escaped))
+    assert np.all(smooth[escaped] > 0) and np.all(smooth[~escaped] == 0)
+    for iteration in [1, 2, 10, 59]:
+        # mandel5's count is limit - iteration, except on the last iteration
+        assert histogram[iteration] == np.count_nonzero(counts == 60 - iteration)
+
+
+def test_smooth_count_close_to_iteration():
+    """ Check the continuous count is within a step of the escape iteration """
+    values = positions(-2.0, 1.0, -1.5, 1.5, 120)
+    counts, smooth, _, _ = mandel_smooth(values, 60)
+    escaped = counts > 0
+    assert np.all(np.abs(smooth[escaped] - (60 - counts[escaped])) < 1.5)
+
+
+def test_equalised_colours():
+    """ Check colours are spread over [0, 1] and follow escape order """
+    values = positions(-2.0, 1.0, -1.5, 1.5, 120)
+    counts, smooth, histogram, escaped = mandel_smooth(values, 60)
+    colour = equalise(smooth, histogram, escaped)
+    assert colour.shape == values.shape
+    assert np.all(colour[~escaped] == 0)
+    assert 0 <= colour.min() and colour.max() <= 1
+    order = np.argsort(smooth[escaped])
+    assert np.all(np.diff(colour[escaped][order]) >= 0)
+
+
+def test_equalised_integer_counts_are_ranks():
+    """ Check a whole iteration count maps to the fraction escaped by then """
+    values = positions(-1.5, 0.5, -1.0, 1.0, 100)
+    counts, smooth, histogram, escaped = mandel_smooth(values, 40)
+    iterations = np.where(escaped, 40 - counts, 0)
+    iterations[np.logical_and(escaped, counts == 0)] = 40
+    colour = equalise(iterations.astype(float), histogram)
+    for iteration in [1, 3, 10, 40]:
+        expected = (np.count_nonzero(iterations[escaped] <= iteration)
+                    / np.count_nonzero(escaped))
+        assert np.allclose(colour[iterations == iteration], expected)
+
+
+def test_fast_escapes_are_not_interior():
+    """ Check pixels far outside the set, escaping at once, are coloured """
+    values = positions(-4.0, 4.0, -4.0, 4.0, 100)
+    counts, smooth, histogram, escaped = mandel_smooth(values, 50)
+    # Most pixels escape within two iterations
+    assert histogram[1] + histogram[2] > values.size // 2
+    assert histogram[0] == np.count_nonzero(np.logical_not(escaped))
+    assert np.all(smooth[escaped] > 0)
+    for colour in [equalise(smooth, histogram, escaped), equalise(smooth, histogram)]:
+        assert np.all(colour[escaped] > 0)
+        assert np.all(colour[~escaped] == 0)
+
+
+def test_zero_limit():
+    """ Check nothing escapes without iterations, and colours are all 0 """
+    values = positions(-2.0, 1.0, -1.5, 1.5, 20)
+    counts, smooth, histogram, escaped = mandel_smooth(values, 0)
+    assert_array_equal(histogram, [values.size])
+    assert not escaped.any()
+    assert_array_equal(equalise(smooth, histogram, escaped), np.zeros(values.shape))
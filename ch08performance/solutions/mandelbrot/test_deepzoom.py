@@ -0,0 +1,60 @@
+""" Tests perturbation deep zooms against plain and arbitrary precision kernels """
+from decimal import Decimal, localcontext
+import numpy as np
+from mandelbrot import mandel5, positions
+from deepzoom import reference_orbit, render_deep
+
+
+def mandel_decimal(x, y, limit, digits=60):
+    """ mandel5's escape count for one point, in arbitrary precision """
+    with localcontext() as context:
+        context.prec = digits
+        zx, zy = x, y
+        while limit > 0:
+            limit -= 1
+            zx, zy = zx * zx - zy * zy + x, 2 * zx * zy + y
+            if zx * zx + zy * zy > 4:
+                return limit
+        return 0
+
+
+def test_reference_orbit():
+    """ Check the orbit starts from zero and stops once it escapes """
+    orbit = reference_orbit("0.5", "0", 100)
+    assert orbit[0] == 0 and orbit[1] == 0.5 and orbit[2] == 0.75
+    assert abs(orbit[-1]) > 2 and all(abs(orbit[:-1]) <= 2)
+    assert len(reference_orbit("-1", "0", 100)) == 102
+
+
+def test_shallow_zoom_agrees_with_mandel5():
+    """ Check the lessons' image, where float64 is plenty """
+    image = render_deep("-0.5", "0", 2.0, 200, limit=50)
+    expected = mandel5(positions(-1.5, 0.5, -1.0, 1.0, 200), 50)
+    assert np.count_nonzero(image != expected) < 0.001 * image.size
+
+
+def test_deep_zoom_agrees_with_arbitrary_precision():
+    """ Check pixels 1e-22 apart, around c = i, against decimal iteration """
+    width, resolution, limit = 1e-20, 50, 2000
+    image = render_deep("0", "1", width, resolution, limit=limit)
+    # float64 cannot tell these pixels apart, but perturbation can
+    assert len(np.unique(image)) > 10
+
+    offsets = np.arange(resolution) * (width / resolution) - width / 2
+    for row, column in [(0, 0), (10, 40), (25, 25), (31, 7), (49, 49)]:
+        x = Decimal(0) + Decimal(float(offsets[column]))
+        y = Decimal(1) + Decimal(float(offsets[row]))
+        assert image[row, column] == mandel_decimal(x, y, limit)
+
+
+def test_reference_outside_the_set():
+    """ Check centres whose orbit escapes at once, outside the circle of radius 2 """
+    for center_x, width, resolution, limit in [("3", 1.0, 4, 50),
+                                               ("-2.0000001", 1e-3, 4, 10),
+                                               ("-2.5", 4.0, 40, 50)]:
+        assert len(reference_orbit(center_x, "0", limit)) == 2
+        image = render_deep(center_x, "0", width, resolution, limit=limit)
+        xmin, ymin = float(center_x) - width / 2, -width / 2
+        offsets = np.arange(resolution) * (width / resolution)
+        expected = mandel5(xmin + offsets[np.newaxis, :] + 1j * (ymin + offsets[:, np.newaxis]), limit)
+        assert np.count_nonzero(image != expected) < 0.01 * image.size
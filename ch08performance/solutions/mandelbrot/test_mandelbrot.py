@@ -0,0 +1,71 @@
+""" Tests the Mandelbrot kernels against each other """
+import numpy as np
+from numpy.testing import assert_array_equal
+from mandelbrot import (mandel1, mandel1_fast, mandel4, mandel5, mandel_active,
+                        mandel_inplace, grid_shape, positions)
+
+
+def lesson_grid(xmin=-1.5, xmax=0.5, ymin=-1.0, ymax=1.0, resolution=60):
+    """ The grid exactly as the notebooks build it """
+    xstep = (xmax - xmin) / resolution
+    ystep = (ymax - ymin) / resolution
+    ymatrix, xmatrix = np.mgrid[ymin:ymax:ystep, xmin:xmax:xstep]
+    return xmatrix + 1j * ymatrix
+
+
+def test_positions_match_mgrid():
+    """ Check positions are bit-identical to the notebooks' grid """
+    for domain in [(-1.5, 0.5, -1.0, 1.0, 60), (-0.75, -0.74, 0.1, 0.11, 37),
+                   (-2, 1, -1.5, 1.5, 101)]:
+        expected = lesson_grid(*domain)
+        assert grid_shape(*domain) == expected.shape
+        assert_array_equal(positions(*domain), expected)
+        assert_array_equal(
+            positions(*domain, rows=slice(3, 20), columns=slice(5, 9)),
+            expected[3:20, 5:9])
+
+
+def test_kernels_agree():
+    """ Check numpy kernels agree with the pure python one """
+    values = lesson_grid()
+    expected = [[mandel1(value) for value in row] for row in values]
+    assert_array_equal(mandel4(values), expected)
+    assert_array_equal(mandel5(values), expected)
+
+
+def test_active_set_matches_mandel5():
+    """ Check the active-set kernel gives exactly mandel5's counts """
+    for domain in [(-1.5, 0.5, -1.0, 1.0, 60), (-2.5, 1.5, -2.0, 2.0, 45)]:
+        values = positions(*domain)
+        for limit in [1, 20, 300]:
+            assert_array_equal(mandel_active(values, limit),
+                               mandel5(values, limit))
+
+
+def test_fast_mandel1_matches_mandel1():
+    """ Check early exits do not change any escape count """
+    values = lesson_grid(-2.0, 0.6, -1.2, 1.2, 80)
+    for limit in [10, 50, 500]:
+        for value in values.flat:
+            assert mandel1_fast(value, limit) == mandel1(value, limit)
+
+
+def test_fast_mandel1_exits_early():
+    """ Check interior points return 0 without running to the limit """
+    # The limit is so high that only an early exit can return in time
+    for value in [0j, -0.1 + 0.2j, -1 + 0.1j, -0.12 + 0.75j]:
+        assert mandel1_fast(value, limit=10**12) == 0
+
+
+def test_inplace_matches_mandel5():
+    """ Check preallocated buffers do not change the double precision counts """
+    values = lesson_grid()
+    for limit in [1, 50, 300]:
+        assert_array_equal(mandel_inplace(values, limit), mandel5(values, limit))
+
+
+def test_single_precision_is_close():
+    """ Check complex64 only changes a few counts, near the boundary """
+    values = lesson_grid(resolution=300)
+    single = mandel_inplace(values, 50, dtype=np.complex64)
+    assert np.count_nonzero(single != mandel5(values, 50)) < 0.001 * single.size
@@ -0,0 +1,44 @@
+""" Tests the progressive, boundary-refining renderer """
+from numpy.testing import assert_array_equal
+from mandelbrot import mandel5, positions
+from progressive import render_progressive
+
+
+def test_matches_mandel5_on_lesson_grid():
+    """ Check the lessons' image is reproduced exactly, with fewer iterations """
+    domain = (-1.5, 0.5, -1.0, 1.0, 300)
+    for limit in [50, 200]:
+        expected = mandel5(positions(*domain), limit)
+        for coarse in [4, 8, 16]:
+            image, iterated = render_progressive(*domain, limit=limit,
+                                                 coarse=coarse)
+            assert_array_equal(image, expected)
+            assert 0 < iterated < 0.75
+
+
+def test_uniform_image_needs_only_coarse_lines():
+    """ Check a region far outside the set is filled from the coarse grid """
+    domain = (10.0, 11.0, 10.0, 11.0, 64)
+    image, iterated = render_progressive(*domain, coarse=8)
+    assert_array_equal(image, mandel5(positions(*domain)))
+    assert iterated == (2 * 9 * 64 - 81) / 64**2
+
+
+def test_odd_shapes():
+    """ Check grids which do not divide evenly into cells """
+    for domain in [(-1.5, 0.5, -1.0, 1.0, 37), (-2.0, 0.5, -1.0, 1.0, 3)]:
+        image, _ = render_progressive(*domain, coarse=8)
+        assert_array_equal(image, mandel5(positions(*domain)))
+
+
+def test_filaments_differ_in_few_pixels():
+    """ Check filaments thinner than a pixel only cost a few wrong pixels
+
+        Near the filaments of the set, some cells have a uniform border but
+        not a uniform inside, so the image is not exact there.
+    """
+    from numpy import count_nonzero
+    domain = (-0.75, -0.73, 0.1, 0.12, 300)
+    expected = mandel5(positions(*domain), 500)
+    image, _ = render_progressive(*domain, limit=500)
+    assert count_nonzero(image != expected) <= 1e-3 * image.size
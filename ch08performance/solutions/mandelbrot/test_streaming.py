@@ -0,0 +1,35 @@
+""" Tests band-by-band rendering to disk """
+from numpy import load, concatenate
+from numpy.testing import assert_array_equal
+from mandelbrot import mandel5, positions
+from streaming import mandel_bands, render_to_file
+
+DOMAIN = (-1.5, 0.5, -1.0, 1.0, 70)
+
+
+def test_bands_stitch_to_image():
+    """ Check bands are in order and make up the whole image """
+    bands = list(mandel_bands(*DOMAIN, limit=30, band_rows=8))
+    assert bands[0][0].start == 0
+    assert all(previous.stop == rows.start
+               for (previous, _), (rows, _) in zip(bands, bands[1:]))
+    assert_array_equal(concatenate([counts for _, counts in bands]),
+                       mandel5(positions(*DOMAIN), 30))
+
+
+def test_render_to_npy(tmp_path):
+    """ Check the memory-mapped file holds the full image """
+    filename = str(tmp_path / "mandelbrot.npy")
+    render_to_file(filename, *DOMAIN, limit=30, band_rows=9)
+    assert_array_equal(load(filename, mmap_mode="r"),
+                       mandel5(positions(*DOMAIN), 30))
+
+
+def test_render_to_hdf5(tmp_path):
+    """ Check the HDF5 dataset holds the full image """
+    from pytest import importorskip
+    h5py = importorskip("h5py")
+    filename = str(tmp_path / "mandelbrot.h5")
+    render_to_file(filename, *DOMAIN, limit=30, band_rows=9)
+    with h5py.File(filename, "r") as image:
+        assert_array_equal(image["counts"], mandel5(positions(*DOMAIN), 30))
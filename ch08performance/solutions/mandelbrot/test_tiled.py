@@ -0,0 +1,25 @@
+""" Tests the tiled renderer gives the same image as the serial kernel """
+from numpy.testing import assert_array_equal
+from mandelbrot import mandel5, positions
+from tiled import render_tiled, tiles
+
+
+def test_tiles_cover_image():
+    """ Check tiles cover every pixel exactly once """
+    from numpy import zeros
+    covered = zeros((23, 17), dtype=int)
+    for rows, columns in tiles(covered.shape, 5):
+        covered[rows, columns] += 1
+    assert_array_equal(covered, 1)
+
+
+def test_identical_to_mandel5():
+    """ Check tiled and serial renders are bit-identical """
+    domain = (-1.5, 0.5, -1.0, 1.0, 90)
+    expected = mandel5(positions(*domain), 40)
+    for processes in [1, 2]:
+        for tile_size in [7, 32, 200]:
+            actual = render_tiled(*domain, limit=40, tile_size=tile_size,
+                                  processes=processes)
+            assert actual.dtype == expected.dtype
+            assert_array_equal(actual, expected)
@@ -0,0 +1,74 @@
+""" Renders the Mandelbrot set tile by tile, over a pool of processes
+
+    Each kernel works pixel by pixel, so cutting the grid into tiles and
+    computing them independently gives exactly the same image as computing the
+    whole grid in one go. Many smaller tiles keep every process busy: tiles
+    inside the set cost ``limit`` iterations per pixel, tiles far outside cost
+    only a few.
+"""
+from functools import partial
+from multiprocessing import Pool
+
+import numpy as np
+
+from mandelbrot import grid_shape, mandel5, positions
+
+
+def tiles(shape, tile_size=128):
+    """ Yields (rows, columns) slices covering an array of the given shape """
+    nrows, ncolumns = shape
+    for row in range(0, nrows, tile_size):
+        for column in range(0, ncolumns, tile_size):
+            yield (slice(row, min(row + tile_size, nrows)),
+                   slice(column, min(column + tile_size, ncolumns)))
+
+
+def render_tile(domain, tile, limit=50, kernel=mandel5):
+    """ Escape counts over one tile of the grid spanned by domain
+
+        :Parameters:
+          domain: tuple
+            (xmin, xmax, ymin, ymax, resolution) of the whole image.
+          tile: tuple
+            (rows, columns) slices of the image to compute.
+    """
+    rows, columns = tile
+    return kernel(positions(*domain, rows=rows, columns=columns), limit)
+
+
+def render_tiled(xmin, xmax, ymin, ymax, resolution, limit=50, kernel=mandel5,
+                 tile_size=128, processes=None):
+    """ Escape counts over the whole grid, computed tile by tile
+
+        :Parameters:
+          kernel: callable
+            Array-wise kernel, e.g. mandel5. Must be defined at module level so
+            it can be sent to other processes.
+          tile_size: integer
+            Number of rows and columns of each tile.
+          processes: integer
+            Size of the process pool. Defaults to the number of cores. With
+            one process, tiles are computed in the current process.
+        :returns: The same array as ``kernel`` on the full grid.
+    """
+    domain = (xmin, xmax, ymin, ymax, resolution)
+    shape = grid_shape(*domain)
+    all_tiles = list(tiles(shape, tile_size))
+    render = partial(render_tile, domain, limit=limit, kernel=kernel)
+
+    if processes == 1:
+        results = map(render, all_tiles)
+        return _stitch(shape, all_tiles, results)
+
+    with Pool(processes) as pool:
+        return _stitch(shape, all_tiles, pool.imap(render, all_tiles))
+
+
+def _stitch(shape, all_tiles, results):
+    """ Copies each computed tile into its place in the full image """
+    image = None
+    for (rows, columns), result in zip(all_tiles, results):
+        if image is None:
+            image = np.empty(shape, dtype=result.dtype)
+        image[rows, columns] = result
+    return image